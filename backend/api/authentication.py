@@ -0,0 +1,47 @@
+from hashlib import sha256
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router
+from rest_framework.authentication import TokenAuthentication
+
+from api.metrics import record_cache
+from users.models import User
+
+USER_SNAPSHOT_FIELDS = tuple(
+    field.attname for field in User._meta.concrete_fields
+    if field.attname in {'id', 'username', 'email', 'first_name',
+                         'last_name', 'is_active', 'is_staff', 'is_superuser'}
+)
+
+
+def token_cache_key(key):
+    return f'auth_token:{sha256(key.encode()).hexdigest()}'
+
+
+def invalidate_tokens(*keys):
+    cache.delete_many([token_cache_key(key) for key in keys])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        snapshot = cache.get(cache_key)
+        if snapshot is not None:
+            record_cache('auth_token', hits=1)
+            return self.restore(key, snapshot)
+        record_cache('auth_token', misses=1)
+        user, token = super().authenticate_credentials(key)
+        cache.set(cache_key,
+                  [getattr(user, field) for field in USER_SNAPSHOT_FIELDS],
+                  settings.TOKEN_CACHE_TIMEOUT)
+        return user, token
+
+    def restore(self, key, snapshot):
+        user = User.from_db(router.db_for_read(User), USER_SNAPSHOT_FIELDS,
+                            snapshot)
+        token = self.get_model().from_db(
+            router.db_for_read(self.get_model()), ('key', 'user_id'),
+            (key, user.id))
+        token.user = user
+        return user, token
@@ -0,0 +1,38 @@
+from django.db import transaction
+
+from api.metrics import record_event
+from api.signals import EVENT_NAMES, bump_on_commit
+from recipes.counters import lock_users
+
+
+def get_statuses(ids, **groups):
+    statuses = {}
+    for status, group in groups.items():
+        for pk in group:
+            statuses.setdefault(pk, status)
+    return [{'id': pk, 'status': statuses.get(pk, 'not_found')}
+            for pk in ids]
+
+
+def add_relations(model, user_id, field, ids, version_keys):
+    lock_users([user_id])
+    existing = set(model.objects.filter(
+        user_id=user_id, **{f'{field}__in': ids}).values_list(
+        field, flat=True))
+    objs = [model(user_id=user_id, **{field: pk})
+            for pk in ids if pk not in existing]
+    model.objects.bulk_create(objs, ignore_conflicts=True)
+    if objs:
+        event, count = f'{EVENT_NAMES[model]}_created', len(objs)
+        bump_on_commit(*version_keys)
+        transaction.on_commit(lambda: record_event(event, count))
+    return [getattr(obj, field) for obj in objs], existing
+
+
+def remove_relations(model, user_id, field, ids):
+    lock_users([user_id])
+    queryset = model.objects.filter(user_id=user_id, **{f'{field}__in': ids})
+    deleted = list(queryset.values_list(field, flat=True))
+    if deleted:
+        queryset.delete()
+    return deleted
@@ -0,0 +1,20 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+
+
+def run_and_release(func, *args, **kwargs):
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+def to_thread(func, *args, **kwargs):
+    return sync_to_async(run_and_release, thread_sensitive=False)(
+        func, *args, **kwargs)
+
+
+async def gather(*calls):
+    return await asyncio.gather(*(to_thread(*call) for call in calls))
@@ -0,0 +1,39 @@
+import csv
+import json
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def export_txt(rows):
+    for row in rows:
+        yield (f"{row['ingredient__name']} - "
+               f"{row['ingredient__measurement_unit']} | "
+               f"{row['amount']}\n")
+
+
+def export_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('Ингредиент', 'Единица измерения', 'Количество'))
+    for row in rows:
+        yield writer.writerow((row['ingredient__name'],
+                               row['ingredient__measurement_unit'],
+                               row['amount']))
+
+
+def export_jsonl(rows):
+    for row in rows:
+        yield json.dumps({'name': row['ingredient__name'],
+                          'measurement_unit': row[
+                              'ingredient__measurement_unit'],
+                          'amount': row['amount']},
+                         ensure_ascii=False) + '\n'
+
+
+EXPORT_FORMATS = {
+    'txt': (export_txt, 'text/plain; charset=UTF-8'),
+    'csv': (export_csv, 'text/csv; charset=UTF-8'),
+    'jsonl': (export_jsonl, 'application/x-ndjson; charset=UTF-8'),
+}
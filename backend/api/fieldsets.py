@@ -0,0 +1,70 @@
+def parse_selectors(values):
+    tree = {}
+    for value in values:
+        for path in value.split(','):
+            *parents, name = path.strip().split('.')
+            node = tree
+            for parent in parents:
+                child = node.get(parent, {})
+                if child is None:
+                    break
+                node = node.setdefault(parent, child)
+            else:
+                if name:
+                    node[name] = None
+    return tree
+
+
+class FieldSelection:
+    def __init__(self, only=None, omit=None):
+        self.only = only
+        self.omit = omit or {}
+
+    @classmethod
+    def from_request(cls, request):
+        params = request.query_params
+        return cls(parse_selectors(params.getlist('fields')) or None,
+                   parse_selectors(params.getlist('omit')))
+
+    def is_empty(self):
+        return self.only is None and not self.omit
+
+    def includes(self, path):
+        name, _, rest = path.partition('.')
+        if self.only is not None and name not in self.only:
+            return False
+        if name in self.omit and self.omit[name] is None:
+            return False
+        return not rest or self.child(name).includes(rest)
+
+    def child(self, name):
+        return FieldSelection(
+            self.only.get(name) if self.only is not None else None,
+            self.omit.get(name))
+
+    def select(self, data):
+        if self.is_empty():
+            return data
+        return {name: value for name, value in data.items()
+                if self.includes(name)}
+
+
+class SelectableFieldsMixin:
+    def get_fields(self):
+        fields = super().get_fields()
+        selection = self.get_field_selection()
+        if selection.is_empty():
+            return fields
+        return {name: field for name, field in fields.items()
+                if selection.includes(name)}
+
+    def get_field_selection(self):
+        names, node = [], self
+        while node.parent is not None:
+            if node.field_name:
+                names.append(node.field_name)
+            node = node.parent
+        selection = self.context.get('field_selection', FieldSelection())
+        for name in reversed(names):
+            selection = selection.child(name)
+        return selection
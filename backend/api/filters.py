@@ -4,8 +4,10 @@ from django_filters.rest_framework.filters import (
     CharFilter,
     ModelMultipleChoiceFilter
 )
+from rest_framework.filters import OrderingFilter
 
 from recipes.models import Ingredient, Recipe, Tag
+from recipes.search import get_backend
 
 
 class IngredientFilter(FilterSet):
@@ -22,10 +24,12 @@ class RecipeFilter(FilterSet):
                                      field_name='tags__slug')
     is_favorited = BooleanFilter(method='get_is_favorited')
     is_in_shopping_cart = BooleanFilter(method='get_is_in_shopping_cart')
+    search = CharFilter(method='get_search')
 
     class Meta:
         model = Recipe
-        fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart')
+        fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart',
+                  'search')
 
     def get_is_in_shopping_cart(self, queryset, name, value):
         if value:
@@ -36,3 +40,18 @@ class RecipeFilter(FilterSet):
         if value:
             return queryset.filter(favorites__user=self.request.user)
         return queryset
+
+    def get_search(self, queryset, name, value):
+        return get_backend().search(queryset, value)
+
+
+class RecipeOrderingFilter(OrderingFilter):
+    tie_breakers = ('-pub_date', '-id')
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if not ordering:
+            return ordering
+        fields = {name.lstrip('-') for name in ordering}
+        return [*ordering, *(name for name in self.tie_breakers
+                             if name.lstrip('-') not in fields)]
@@ -0,0 +1,59 @@
+import bisect
+import threading
+
+from rest_framework.renderers import JSONRenderer
+
+from api.metrics import record_cache
+from api.serializers import IngredientSerializer
+from api.versions import bump_versions, get_version
+from recipes.models import Ingredient
+
+
+class IngredientIndex:
+    version_key = 'ingredient_index_version'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._index = ([], [])
+
+    def get_version(self):
+        return get_version(self.version_key)
+
+    def invalidate(self):
+        bump_versions(self.version_key)
+
+    def search(self, prefix=''):
+        keys, items = self._get_index()
+        prefix = prefix.casefold()
+        found = []
+        for position in range(bisect.bisect_left(keys, prefix), len(keys)):
+            if not keys[position].startswith(prefix):
+                break
+            found.append(items[position])
+        found.sort()
+        return b'[' + b','.join(data for _, data in found) + b']'
+
+    def _get_index(self):
+        version = self.get_version()
+        with self._lock:
+            if version != self._version:
+                record_cache('ingredient_index', misses=1)
+                self._index = self._build()
+                self._version = version
+            else:
+                record_cache('ingredient_index', hits=1)
+            return self._index
+
+    def _build(self):
+        renderer = JSONRenderer()
+        rows = sorted(
+            (ingredient.name.casefold(), order,
+             renderer.render(IngredientSerializer(ingredient).data))
+            for order, ingredient in enumerate(Ingredient.objects.all())
+        )
+        return ([key for key, _, _ in rows],
+                [(order, data) for _, order, data in rows])
+
+
+ingredient_index = IngredientIndex()
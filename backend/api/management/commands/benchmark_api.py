@@ -0,0 +1,360 @@
+import json
+import subprocess
+from base64 import b64encode
+from io import BytesIO
+from statistics import mean, median, quantiles
+from time import perf_counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLResolver, reverse
+from django.utils import timezone
+from PIL import Image
+from rest_framework.authtoken.models import Token
+
+import api.urls
+from recipes.management.commands.generate_dataset import PASSWORD
+from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
+from users.models import Follow, User
+
+SKIPPED_ROUTES = {
+    'users-activation': 'требует токен из письма',
+    'users-resend-activation': 'отправляет письмо',
+    'users-reset-password': 'отправляет письмо',
+    'users-reset-password-confirm': 'требует токен из письма',
+    'users-reset-username': 'отправляет письмо',
+    'users-reset-username-confirm': 'требует токен из письма',
+    'users-set-username': 'поле логина совпадает с email',
+}
+
+
+def get_route_names(patterns):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from get_route_names(pattern.url_patterns)
+        elif pattern.name:
+            yield pattern.name
+
+
+class Command(BaseCommand):
+    help = ('Прогоняет все маршруты API через тестовый клиент и записывает '
+            'p50/p95 и число SQL-запросов в JSON.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=30)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--output', help='Файл для результатов в JSON.')
+        parser.add_argument('--baseline',
+                            help='JSON прошлого прогона для сравнения.')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='Допустимый рост p95, доля от базового.')
+
+    def handle(self, *args, **options):
+        with override_settings(
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            try:
+                with transaction.atomic():
+                    report = self._run(options)
+                    transaction.set_rollback(True)
+            finally:
+                cache.clear()
+        data = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='UTF-8') as file:
+                file.write(data)
+        else:
+            self.stdout.write(data)
+        if options['baseline']:
+            self._compare(report, options['baseline'], options['tolerance'])
+
+    def _run(self, options):
+        scenarios = self._get_scenarios()
+        covered = {route for _, steps in scenarios for _, route, *_ in steps}
+        routes = set(get_route_names(api.urls.router_v1.urls))
+        routes.update(('login', 'logout'))
+        missing = routes - covered - set(SKIPPED_ROUTES)
+        if missing:
+            raise CommandError(
+                f'Нет сценариев для маршрутов: {", ".join(sorted(missing))}')
+
+        results = {}
+        for _ in range(options['warmup']):
+            for name, steps in scenarios:
+                self._run_steps(steps)
+        for _ in range(options['iterations']):
+            for name, steps in scenarios:
+                for label, measure in self._run_steps(steps):
+                    results.setdefault(f'{name}:{label}', []).append(measure)
+
+        return {
+            'commit': self._get_commit(),
+            'created_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'iterations': options['iterations'],
+            'dataset': {
+                'users': User.objects.count(),
+                'recipes': Recipe.objects.count(),
+                'favorites': Favorite.objects.count(),
+                'shopping_carts': ShoppingCart.objects.count(),
+                'follows': Follow.objects.count(),
+            },
+            'skipped': SKIPPED_ROUTES,
+            'results': {
+                name: self._summarize(measures)
+                for name, measures in results.items()
+            },
+        }
+
+    def _get_scenarios(self):
+        user = User.objects.annotate(
+            follows=Count('follower')).order_by('-follows', 'id').first()
+        if user is None or not Recipe.objects.exists():
+            raise CommandError('База пуста, сначала выполните '
+                               'generate_dataset.')
+        login_user = User.objects.exclude(id=user.id).order_by('id').first()
+        for account in (user, login_user):
+            account.set_password(PASSWORD)
+            account.save()
+        self.reader_id = user.id
+        self.login_email = login_user.email
+        self.reader = self._client(user)
+        self.planner = self._client(User.objects.exclude(
+            id__in=(user.id, login_user.id)).order_by('id').first())
+        self.anonymous = Client()
+        recipe = Recipe.objects.order_by('-favorites_count', '-id').first()
+        free_recipes = list(Recipe.objects.exclude(
+            favorites__user=user).exclude(shopping_carts__user=user).order_by(
+            '-id').values_list('id', flat=True)[:7])
+        free_recipe = Recipe.objects.get(id=free_recipes[0])
+        authors = list(User.objects.exclude(id=user.id).exclude(
+            following__user=user).order_by('id').values_list(
+            'id', flat=True)[:7])
+        author = User.objects.get(id=authors[0])
+        tag = Tag.objects.order_by('id').first()
+        ingredient = Ingredient.objects.order_by('id').first()
+        recipe_data = self._get_recipe_data(tag, ingredient)
+        own_recipe = self._create_recipe(recipe_data)
+        self._run_on_commit()
+        self.counter = 0
+        return [
+            ('root', [('get', 'api-root', {}, {}, None)]),
+            ('tags', [
+                ('list', 'tags-list', {}, {}, None),
+                ('detail', 'tags-detail', {'pk': tag.id}, {}, None),
+            ]),
+            ('ingredients', [
+                ('search', 'ingredients-list', {}, {'name': 'мол'}, None),
+                ('detail', 'ingredients-detail', {'pk': ingredient.id}, {},
+                 None),
+            ]),
+            ('recipes', [
+                ('anonymous', 'recipes-list', {}, {}, None),
+                ('list', 'recipes-list', {}, {}, self.reader),
+                ('tags', 'recipes-list', {}, {'tags': tag.slug},
+                 self.reader),
+                ('favorited', 'recipes-list', {}, {'is_favorited': 1},
+                 self.reader),
+                ('search', 'recipes-list', {}, {'search': 'рецепт'},
+                 self.reader),
+                ('popular', 'recipes-list', {},
+                 {'ordering': '-favorites_count'}, self.reader),
+                ('cursor', 'recipes-list', {}, {'pagination': 'cursor'},
+                 self.reader),
+                ('detail', 'recipes-detail', {'pk': recipe.id}, {},
+                 self.reader),
+                ('similar', 'recipes-similar', {'pk': recipe.id}, {},
+                 self.reader),
+                ('feed', 'recipes-feed', {}, {}, self.reader),
+                ('download', 'recipes-download-shopping-cart', {}, {},
+                 self.reader),
+            ]),
+            ('recipe_write', [
+                ('create', 'recipes-list', {}, recipe_data, self.reader,
+                 'post'),
+                ('update', 'recipes-detail', {'pk': own_recipe.id},
+                 recipe_data, self.reader, 'patch'),
+                ('delete', 'recipes-detail', self._last_recipe, {},
+                 self.reader, 'delete'),
+            ]),
+            ('favorite', [
+                ('add', 'recipes-favorite', {'pk': free_recipe.id}, {},
+                 self.reader, 'post'),
+                ('remove', 'recipes-favorite', {'pk': free_recipe.id}, {},
+                 self.reader, 'delete'),
+                ('add_batch', 'recipes-favorite-batch', {},
+                 {'ids': free_recipes}, self.reader, 'post'),
+                ('remove_batch', 'recipes-favorite-batch', {},
+                 {'ids': free_recipes}, self.reader, 'delete'),
+            ]),
+            ('shopping_cart', [
+                ('add', 'recipes-shopping-cart', {'pk': free_recipe.id}, {},
+                 self.reader, 'post'),
+                ('remove', 'recipes-shopping-cart', {'pk': free_recipe.id},
+                 {}, self.reader, 'delete'),
+                ('add_batch', 'recipes-shopping-cart-batch', {},
+                 {'ids': free_recipes}, self.reader, 'post'),
+                ('remove_batch', 'recipes-shopping-cart-batch', {},
+                 {'ids': free_recipes}, self.reader, 'delete'),
+                ('add_plan', 'recipes-shopping-cart-batch', {},
+                 {'ids': free_recipes}, self.planner, 'post'),
+                ('clear', 'recipes-clear-shopping-cart', {}, {},
+                 self.planner, 'delete'),
+            ]),
+            ('users', [
+                ('list', 'users-list', {}, {}, self.reader),
+                ('detail', 'users-detail', {'id': author.id}, {},
+                 self.reader),
+                ('me', 'users-me', {}, {}, self.reader),
+                ('subscriptions', 'users-subscriptions', {},
+                 {'recipes_limit': 3}, self.reader),
+            ]),
+            ('subscribe', [
+                ('add', 'users-subscribe', {'id': author.id}, {},
+                 self.reader, 'post'),
+                ('remove', 'users-subscribe', {'id': author.id}, {},
+                 self.reader, 'delete'),
+                ('add_batch', 'users-subscribe-batch', {}, {'ids': authors},
+                 self.reader, 'post'),
+                ('remove_batch', 'users-subscribe-batch', {},
+                 {'ids': authors}, self.reader, 'delete'),
+            ]),
+            ('account', [
+                ('register', 'users-list', {}, self._new_user, None,
+                 'post'),
+                ('set_password', 'users-set-password', {},
+                 {'current_password': PASSWORD, 'new_password': PASSWORD},
+                 self.reader, 'post'),
+                ('login', 'login', {},
+                 {'email': login_user.email, 'password': PASSWORD}, None,
+                 'post'),
+                ('logout', 'logout', {}, {}, self._login_client,
+                 'post'),
+            ]),
+        ]
+
+    def _run_steps(self, steps):
+        measures = []
+        for label, route, kwargs, data, client, *method in steps:
+            method = method[0] if method else 'get'
+            kwargs = kwargs() if callable(kwargs) else kwargs
+            data = data() if callable(data) else data
+            client = client() if callable(client) else (
+                client or self.anonymous)
+            url = reverse(f'api:{route}', kwargs=kwargs)
+            request = getattr(client, method)
+            if method == 'get':
+                call = (lambda: request(url, data))
+            else:
+                call = (lambda: request(url, data,
+                                        content_type='application/json'))
+            with CaptureQueriesContext(connection) as queries:
+                start = perf_counter()
+                response = call()
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                self._run_on_commit()
+                elapsed = (perf_counter() - start) * 1000
+            if response.status_code >= 400:
+                raise CommandError(
+                    f'{label} {method.upper()} {url}: '
+                    f'{response.status_code} {response.content[:200]!r}')
+            measures.append((label, {'ms': elapsed, 'queries': len(queries),
+                                     'status': response.status_code}))
+        return measures
+
+    def _run_on_commit(self):
+        while connection.run_on_commit:
+            callbacks = connection.run_on_commit
+            connection.run_on_commit = []
+            for _, callback, *_ in callbacks:
+                callback()
+
+    def _summarize(self, measures):
+        timings = [item['ms'] for item in measures]
+        counts = [item['queries'] for item in measures]
+        p50, p95 = ((quantiles(timings, n=100)[index] for index in (49, 94))
+                    if len(timings) > 1 else (timings[0], timings[0]))
+        return {
+            'p50_ms': round(p50, 3),
+            'p95_ms': round(p95, 3),
+            'mean_ms': round(mean(timings), 3),
+            'queries': median(counts),
+            'queries_max': max(counts),
+            'status': sorted({item['status'] for item in measures}),
+        }
+
+    def _compare(self, report, path, tolerance):
+        with open(path, encoding='UTF-8') as file:
+            baseline = json.load(file)['results']
+        regressions = []
+        for name, current in report['results'].items():
+            previous = baseline.get(name)
+            if previous is None:
+                continue
+            if current['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+                regressions.append(
+                    f'{name}: p95 {previous["p95_ms"]} → '
+                    f'{current["p95_ms"]} мс')
+            if current['queries'] > previous['queries']:
+                regressions.append(
+                    f'{name}: запросов {previous["queries"]} → '
+                    f'{current["queries"]}')
+        if regressions:
+            raise CommandError('Регрессии:\n' + '\n'.join(regressions))
+        self.stderr.write(self.style.SUCCESS('Регрессий нет.'))
+
+    def _get_commit(self):
+        try:
+            return subprocess.run(
+                ('git', 'rev-parse', 'HEAD'), capture_output=True,
+                check=True, cwd=settings.BASE_DIR, text=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def _client(self, user):
+        token, _ = Token.objects.get_or_create(user=user)
+        return Client(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    def _create_recipe(self, data):
+        response = self.reader.post(reverse('api:recipes-list'), data,
+                                    content_type='application/json')
+        if response.status_code != 201:
+            raise CommandError(f'Не удалось создать рецепт: '
+                               f'{response.content[:200]!r}')
+        return Recipe.objects.get(id=response.json()['id'])
+
+    def _get_recipe_data(self, tag, ingredient):
+        buffer = BytesIO()
+        Image.new('RGB', (8, 8), '#e26c2d').save(buffer, 'PNG')
+        return {
+            'name': 'Рецепт для замера',
+            'text': 'Описание',
+            'cooking_time': 10,
+            'tags': [tag.id],
+            'ingredients': [{'id': ingredient.id, 'amount': 10}],
+            'image': 'data:image/png;base64,' + b64encode(
+                buffer.getvalue()).decode(),
+        }
+
+    def _last_recipe(self):
+        return {'pk': Recipe.objects.filter(author_id=self.reader_id).order_by(
+            '-id').values_list('id', flat=True).first()}
+
+    def _new_user(self):
+        self.counter += 1
+        return {'email': f'benchmark_{self.counter}@example.com',
+                'username': f'benchmark_{self.counter}',
+                'first_name': 'Замер', 'last_name': 'Замер',
+                'password': PASSWORD}
+
+    def _login_client(self):
+        response = self.anonymous.post(
+            reverse('api:login'),
+            {'email': self.login_email, 'password': PASSWORD})
+        return Client(
+            HTTP_AUTHORIZATION=f'Token {response.json()["auth_token"]}')
@@ -0,0 +1,51 @@
+from statistics import mean, quantiles
+from time import perf_counter
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from api.authentication import CachedTokenAuthentication, token_cache_key
+from users.models import User
+
+BACKENDS = {
+    'stock': TokenAuthentication,
+    'cached': CachedTokenAuthentication,
+}
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает стандартную и кэширующую аутентификацию по токену.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = User.objects.create_user(
+                username='benchmark_auth', email='benchmark_auth@example.com')
+            token = Token.objects.create(user=user)
+            request = RequestFactory().get(
+                '/api/users/me/', HTTP_AUTHORIZATION=f'Token {token.key}')
+            for name, backend in BACKENDS.items():
+                cache.delete(token_cache_key(token.key))
+                self._run(name, backend(), request, options['requests'])
+            cache.delete(token_cache_key(token.key))
+            transaction.set_rollback(True)
+
+    def _run(self, name, backend, request, count):
+        timings = []
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(count):
+                start = perf_counter()
+                backend.authenticate(request)
+                timings.append((perf_counter() - start) * 1e6)
+        p50, p95 = (quantiles(timings, n=100)[index] for index in (49, 94))
+        self.stdout.write(
+            f'{name:>6}: запросов к БД {len(queries)}, '
+            f'среднее {mean(timings):.1f} мкс, '
+            f'p50 {p50:.1f} мкс, p95 {p95:.1f} мкс')
@@ -0,0 +1,118 @@
+import json
+from time import perf_counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Recipe, Tag
+from users.models import User
+
+MODES = {'before': False, 'after': True}
+
+
+class Command(BaseCommand):
+    help = ('Проверяет побайтовое совпадение ответов быстрого пути '
+            'рецептов со штатными сериализаторами и сравнивает число '
+            'запросов в секунду на один воркер до и после.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument('--output', help='Файл для результатов в JSON.')
+
+    def handle(self, *args, **options):
+        user = User.objects.annotate(
+            favorited=Count('favorites')).order_by('-favorited', 'id').first()
+        recipe = Recipe.objects.order_by('-favorites_count', '-id').first()
+        if user is None or recipe is None:
+            raise CommandError('База пуста, сначала выполните '
+                               'generate_dataset.')
+        token, _ = Token.objects.get_or_create(user=user)
+        clients = {
+            'anonymous': Client(),
+            'user': Client(HTTP_AUTHORIZATION=f'Token {token.key}'),
+        }
+        paths = self._get_paths(recipe)
+        parity_paths = [*paths, *self._get_edge_paths(user)]
+
+        with override_settings(
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+                RESPONSE_CACHE_TIMEOUT=0):
+            mismatches = self._check_parity(clients, parity_paths)
+            if mismatches:
+                raise CommandError(
+                    'Ответы быстрого пути отличаются: '
+                    f'{", ".join(mismatches)}')
+            report = {
+                'created_at': timezone.now().isoformat(),
+                'iterations': options['iterations'],
+                'parity_checked': len(clients) * len(parity_paths),
+                'results': {
+                    f'{name} {path}': self._benchmark(client, path, options)
+                    for name, client in clients.items()
+                    for path in paths
+                },
+            }
+        data = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='UTF-8') as file:
+                file.write(data)
+        else:
+            self.stdout.write(data)
+
+    def _get_paths(self, recipe):
+        tag = Tag.objects.first()
+        return [
+            '/api/recipes/',
+            '/api/recipes/?limit=50',
+            f'/api/recipes/{recipe.id}/',
+            f'/api/recipes/?tags={tag.slug}' if tag else '/api/recipes/',
+            '/api/recipes/?pagination=cursor&limit=20',
+            f'/api/recipes/?author={recipe.author_id}&limit=20',
+        ]
+
+    def _get_edge_paths(self, user):
+        recipes = Recipe.objects.filter(
+            favorites__user=user).values_list('id', flat=True)[:5]
+        return [
+            '/api/recipes/?ordering=-favorites_count&limit=20',
+            '/api/recipes/?pagination=nocount&page=3',
+            '/api/recipes/?page=2&limit=1',
+            '/api/recipes/?limit=0',
+            '/api/recipes/0/',
+            *(f'/api/recipes/{pk}/' for pk in recipes),
+        ]
+
+    def _check_parity(self, clients, paths):
+        mismatches = []
+        for name, client in clients.items():
+            for path in paths:
+                responses = []
+                for enabled in MODES.values():
+                    with override_settings(FAST_RENDERING=enabled):
+                        response = client.get(path)
+                    responses.append((response.status_code,
+                                      response.content))
+                if responses[0] != responses[1]:
+                    mismatches.append(f'{name} {path}')
+        return mismatches
+
+    def _benchmark(self, client, path, options):
+        result = {}
+        for mode, enabled in MODES.items():
+            with override_settings(FAST_RENDERING=enabled):
+                for _ in range(options['warmup']):
+                    client.get(path)
+                start = perf_counter()
+                for _ in range(options['iterations']):
+                    client.get(path)
+                elapsed = perf_counter() - start
+            result[f'{mode}_rps'] = round(options['iterations'] / elapsed, 1)
+        result['speedup'] = round(result['after_rps'] / result['before_rps'],
+                                  2)
+        return result
@@ -0,0 +1,205 @@
+import http.client
+import json
+import os
+import signal
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from statistics import quantiles
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Recipe
+from users.models import User
+
+SERVERS = {
+    'gunicorn-sync': {
+        'command': ('gunicorn', 'foodgram.wsgi:application'),
+        'env': {'ASYNC_READ_VIEWS': 'False'},
+    },
+    'uvicorn': {
+        'command': ('gunicorn', 'foodgram.asgi:application',
+                    '-k', 'uvicorn.workers.UvicornWorker'),
+        'env': {'ASYNC_READ_VIEWS': 'True'},
+    },
+}
+
+
+def get_children(pid):
+    children = []
+    for stat in Path('/proc').glob('[0-9]*/stat'):
+        try:
+            fields = stat.read_text().rsplit(')', 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == pid:
+            children.append(int(stat.parent.name))
+    return children
+
+
+def get_rss(pid):
+    try:
+        for line in Path(f'/proc/{pid}/status').read_text().splitlines():
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает пропускную способность uvicorn и синхронных '
+            'воркеров gunicorn при одинаковом бюджете памяти.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--servers', nargs='+', choices=SERVERS,
+                            default=list(SERVERS))
+        parser.add_argument('--memory-mb', type=int, default=512,
+                            help='Бюджет памяти на все воркеры сервера.')
+        parser.add_argument('--concurrency', type=int, default=32)
+        parser.add_argument('--duration', type=float, default=20)
+        parser.add_argument('--warmup', type=float, default=3)
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--output', help='Файл для результатов в JSON.')
+
+    def handle(self, *args, **options):
+        user = User.objects.annotate(
+            follows=Count('follower')).order_by('-follows', 'id').first()
+        recipe = Recipe.objects.order_by('-favorites_count', '-id').first()
+        if user is None or recipe is None:
+            raise CommandError('База пуста, сначала выполните '
+                               'generate_dataset.')
+        token, _ = Token.objects.get_or_create(user=user)
+        self.headers = {'Authorization': f'Token {token.key}'}
+        self.paths = ('/api/recipes/', f'/api/recipes/{recipe.id}/',
+                      '/api/tags/',
+                      f'/api/ingredients/?{urlencode({"name": "мол"})}',
+                      '/api/recipes/download_shopping_cart/')
+        self.port = options['port']
+
+        report = {
+            'created_at': timezone.now().isoformat(),
+            'memory_mb': options['memory_mb'],
+            'concurrency': options['concurrency'],
+            'duration': options['duration'],
+            'paths': self.paths,
+            'servers': {},
+        }
+        for name in options['servers']:
+            report['servers'][name] = self._benchmark(name, options)
+        data = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='UTF-8') as file:
+                file.write(data)
+        else:
+            self.stdout.write(data)
+
+    def _benchmark(self, name, options):
+        with self._server(name, 1) as process:
+            self._load(options['concurrency'], options['warmup'])
+            worker_rss = max(map(get_rss, get_children(process.pid)),
+                             default=0)
+        if not worker_rss:
+            raise CommandError(f'{name}: не удалось измерить память воркера.')
+        workers = max(1, options['memory_mb'] * 1024 ** 2 // worker_rss)
+        self.stderr.write(f'{name}: воркер {worker_rss / 1024 ** 2:.1f} МБ, '
+                          f'запускаем {workers}.')
+
+        with self._server(name, workers) as process:
+            self._load(options['concurrency'], options['warmup'])
+            latencies, errors, elapsed = self._load(
+                options['concurrency'], options['duration'])
+            rss = sum(map(get_rss, get_children(process.pid)))
+        p50, p95 = (quantiles(latencies, n=100)[index] for index in (49, 94))
+        return {
+            'workers': workers,
+            'worker_rss_mb': round(worker_rss / 1024 ** 2, 1),
+            'rss_mb': round(rss / 1024 ** 2, 1),
+            'requests': len(latencies),
+            'errors': errors,
+            'rps': round(len(latencies) / elapsed, 1),
+            'p50_ms': round(p50 * 1000, 3),
+            'p95_ms': round(p95 * 1000, 3),
+        }
+
+    @contextmanager
+    def _server(self, name, workers):
+        server = SERVERS[name]
+        command = (*server['command'], '-w', str(workers),
+                   '--bind', f'127.0.0.1:{self.port}')
+        process = subprocess.Popen(
+            command, cwd=settings.BASE_DIR, env={**os.environ,
+                                                 **server['env']},
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            self._wait(process)
+            yield process
+        finally:
+            process.send_signal(signal.SIGTERM)
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+
+    def _wait(self, process, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError('Сервер завершился при запуске.')
+            connection = http.client.HTTPConnection(
+                '127.0.0.1', self.port, timeout=5)
+            try:
+                self._request(connection, '/api/tags/')
+                return
+            except OSError:
+                time.sleep(0.2)
+            finally:
+                connection.close()
+        raise CommandError('Сервер не запустился.')
+
+    def _request(self, connection, path):
+        connection.request('GET', path, headers=self.headers)
+        response = connection.getresponse()
+        response.read()
+        return response.status
+
+    def _load(self, concurrency, duration):
+        latencies, errors = [], []
+        deadline = time.monotonic() + duration
+
+        def worker(offset):
+            connection = http.client.HTTPConnection(
+                '127.0.0.1', self.port, timeout=30)
+            number = offset
+            while time.monotonic() < deadline:
+                path = self.paths[number % len(self.paths)]
+                number += 1
+                start = time.perf_counter()
+                try:
+                    status = self._request(connection, path)
+                except (OSError, http.client.HTTPException):
+                    connection.close()
+                    errors.append(path)
+                    continue
+                if status >= 400:
+                    errors.append(path)
+                else:
+                    latencies.append(time.perf_counter() - start)
+            connection.close()
+
+        start = time.monotonic()
+        threads = [threading.Thread(target=worker, args=(index,))
+                   for index in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return latencies, len(errors), time.monotonic() - start
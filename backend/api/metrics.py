@@ -0,0 +1,70 @@
+import os
+from hmac import compare_digest
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess
+)
+
+REQUESTS = Counter(
+    'foodgram_http_requests_total', 'Запросы к приложению.',
+    ('view', 'action', 'method', 'status'))
+REQUEST_DURATION = Histogram(
+    'foodgram_http_request_duration_seconds', 'Время обработки запроса.',
+    ('view', 'action'),
+    buckets=(.005, .01, .025, .05, .075, .1, .25, .5, .75, 1, 2.5, 5, 10))
+DB_QUERIES = Histogram(
+    'foodgram_db_queries', 'Число SQL-запросов на запрос к приложению.',
+    ('view', 'action'), buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89))
+DB_DURATION = Histogram(
+    'foodgram_db_duration_seconds', 'Время SQL-запросов на запрос.',
+    ('view', 'action'),
+    buckets=(.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5))
+CACHE_REQUESTS = Counter(
+    'foodgram_cache_requests_total', 'Обращения к кешам.',
+    ('cache', 'result'))
+EVENTS = Counter(
+    'foodgram_events_total', 'Бизнес-события.', ('event',))
+
+
+def record_cache(name, hits=0, misses=0):
+    if hits:
+        CACHE_REQUESTS.labels(name, 'hit').inc(hits)
+    if misses:
+        CACHE_REQUESTS.labels(name, 'miss').inc(misses)
+
+
+def record_event(event, count=1):
+    if count:
+        EVENTS.labels(event).inc(count)
+
+
+def get_view_labels(request):
+    match = request.resolver_match
+    if match is None:
+        return 'unmatched', ''
+    view = getattr(match.func, 'cls', None)
+    if view is None:
+        return match.view_name, ''
+    actions = getattr(match.func, 'actions', None) or {}
+    return view.__name__, actions.get(request.method.lower(), '')
+
+
+def metrics_view(request):
+    if settings.METRICS_TOKEN and not compare_digest(
+            request.headers.get('Authorization', ''),
+            f'Bearer {settings.METRICS_TOKEN}'):
+        return HttpResponseForbidden()
+    registry = REGISTRY
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return HttpResponse(generate_latest(registry),
+                        content_type=CONTENT_TYPE_LATEST)
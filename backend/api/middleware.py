@@ -0,0 +1,241 @@
+import asyncio
+import json
+import logging
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from hashlib import md5
+from time import perf_counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from api.concurrency import to_thread
+from api.metrics import (
+    DB_DURATION,
+    DB_QUERIES,
+    REQUEST_DURATION,
+    REQUESTS,
+    get_view_labels
+)
+from api.replicas import get_pin_keys, is_pinned, pin_response, use_replicas
+
+logger = logging.getLogger('api.instrumentation')
+active_recorders = ContextVar('active_recorders', default=())
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryRecorder:
+    def __init__(self, keep_statements=False):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter() if keep_statements else None
+        self._lock = threading.Lock()
+
+    def add(self, sql, duration):
+        with self._lock:
+            self.count += 1
+            self.duration += duration
+            if self.statements is not None:
+                self.statements[sql] += 1
+
+    def get_duplicates(self, limit=5):
+        return [
+            {'fingerprint': md5(sql.encode()).hexdigest()[:12],
+             'count': count,
+             'sql': sql[:200]}
+            for sql, count in self.statements.most_common(limit)
+            if count > 1
+        ]
+
+
+def record_queries(execute, sql, params, many, context):
+    recorders = active_recorders.get()
+    if not recorders:
+        return execute(sql, params, many, context)
+    start = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = perf_counter() - start
+        for recorder in recorders:
+            recorder.add(sql, duration)
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    if record_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_queries)
+
+
+@contextmanager
+def recording(recorder):
+    token = active_recorders.set((*active_recorders.get(), recorder))
+    try:
+        yield recorder
+    finally:
+        active_recorders.reset(token)
+
+
+class RecordingMiddleware:
+    sync_capable = True
+    async_capable = True
+    setting = None
+
+    def __init__(self, get_response):
+        if not getattr(settings, self.setting):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self._async_mode = asyncio.iscoroutinefunction(get_response)
+        if self._async_mode:
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+        connection_created.connect(install_query_recorder,
+                                   dispatch_uid='api.record_queries')
+        for connection in connections.all():
+            install_query_recorder(None, connection)
+
+    def __call__(self, request):
+        if self._async_mode:
+            return self.__acall__(request)
+        self.start(request)
+        with recording(self.get_recorder()) as recorder:
+            response = self.get_response(request)
+        return self.finish(request, response, recorder)
+
+    async def __acall__(self, request):
+        self.start(request)
+        with recording(self.get_recorder()) as recorder:
+            response = await self.get_response(request)
+        return self.finish(request, response, recorder)
+
+    def get_recorder(self):
+        return QueryRecorder()
+
+    def start(self, request):
+        pass
+
+    def finish(self, request, response, recorder):
+        return response
+
+
+class InstrumentationMiddleware(RecordingMiddleware):
+    setting = 'QUERY_INSTRUMENTATION'
+
+    def get_recorder(self):
+        return QueryRecorder(keep_statements=True)
+
+    def start(self, request):
+        request.timings = {'start': perf_counter()}
+
+    def finish(self, request, response, recorder):
+        timings = request.timings
+        end = perf_counter()
+        view_end = timings.get('render', end)
+        metrics = {
+            'db': recorder.duration * 1000,
+            'view': (view_end - timings.get('view', view_end)) * 1000,
+            'render': (end - timings['render']) * 1000
+            if 'render' in timings else 0.0,
+            'total': (end - timings['start']) * 1000,
+        }
+        duplicates = recorder.get_duplicates()
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={metrics["db"]:.2f};desc="{recorder.count} queries"',
+            f'view;dur={metrics["view"]:.2f}',
+            f'render;dur={metrics["render"]:.2f}',
+            f'total;dur={metrics["total"]:.2f}',
+            f'dup;desc="{sum(item["count"] - 1 for item in duplicates)}"',
+        ))
+
+        match = request.resolver_match
+        view_name = match.view_name if match else None
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'view': view_name,
+            'status': response.status_code,
+            'queries': recorder.count,
+            **{f'{name}_ms': round(value, 2)
+               for name, value in metrics.items()},
+            'duplicates': duplicates,
+        }, ensure_ascii=False))
+        self.check_budget(view_name, recorder.count)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.timings['view'] = perf_counter()
+
+    def process_template_response(self, request, response):
+        request.timings['render'] = perf_counter()
+        return response
+
+    def check_budget(self, view_name, count):
+        budget = settings.QUERY_BUDGETS.get(view_name, settings.QUERY_BUDGET)
+        if not budget or count <= budget:
+            return
+        message = (f'{view_name}: {count} SQL-запросов '
+                   f'при бюджете {budget}.')
+        if settings.QUERY_BUDGET_STRICT:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+
+class MetricsMiddleware(RecordingMiddleware):
+    setting = 'METRICS_ENABLED'
+
+    def start(self, request):
+        request.metrics_start = perf_counter()
+
+    def finish(self, request, response, recorder):
+        duration = perf_counter() - request.metrics_start
+        view, action = get_view_labels(request)
+        REQUESTS.labels(view, action, request.method,
+                        response.status_code).inc()
+        REQUEST_DURATION.labels(view, action).observe(duration)
+        DB_QUERIES.labels(view, action).observe(recorder.count)
+        DB_DURATION.labels(view, action).observe(recorder.duration)
+        return response
+
+
+class ReplicaMiddleware:
+    sync_capable = True
+    async_capable = True
+    read_methods = ('GET', 'HEAD')
+
+    def __init__(self, get_response):
+        if not settings.DB_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self._async_mode = asyncio.iscoroutinefunction(get_response)
+        if self._async_mode:
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self._async_mode:
+            return self.__acall__(request)
+        if request.method not in self.read_methods:
+            response = self.get_response(request)
+            pin_response(request, response)
+            return response
+        token = use_replicas.set(not is_pinned(get_pin_keys(request)))
+        try:
+            return self.get_response(request)
+        finally:
+            use_replicas.reset(token)
+
+    async def __acall__(self, request):
+        if request.method not in self.read_methods:
+            response = await self.get_response(request)
+            await to_thread(pin_response, request, response)
+            return response
+        token = use_replicas.set(
+            not await to_thread(is_pinned, get_pin_keys(request)))
+        try:
+            return await self.get_response(request)
+        finally:
+            use_replicas.reset(token)
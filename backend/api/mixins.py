@@ -1,8 +1,346 @@
+from functools import cached_property
+from hashlib import md5
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponseNotModified
+from django.utils.http import (
+    http_date,
+    parse_etags,
+    parse_http_date_safe,
+    quote_etag
+)
+from rest_framework.generics import get_object_or_404
 from rest_framework.mixins import ListModelMixin, RetrieveModelMixin
+from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 
+from api.concurrency import gather, to_thread
+from api.fieldsets import FieldSelection
+from api.metrics import record_cache
+from api.versions import get_versions, version_timestamp
+
+
+class AsyncReadMixin:
+    is_async = False
+
+    @classmethod
+    def as_async_view(cls, sync_view):
+        actions = sync_view.actions
+        handlers = {method: f'a{action}' for method, action in actions.items()
+                    if method == 'get' and hasattr(cls, f'a{action}')}
+        if not handlers:
+            return sync_view
+        handlers.setdefault('head', handlers['get'])
+
+        async def view(request, *args, **kwargs):
+            if request.method.lower() not in handlers:
+                return await sync_to_async(sync_view)(request, *args, **kwargs)
+            self = cls(**sync_view.initkwargs)
+            self.action_map = actions
+            for method, action in actions.items():
+                setattr(self, method, getattr(self, action))
+            if hasattr(self, 'get') and not hasattr(self, 'head'):
+                self.head = self.get
+            self.async_handlers = handlers
+            return await self.adispatch(request, *args, **kwargs)
+
+        view.cls = cls
+        view.initkwargs = sync_view.initkwargs
+        view.actions = actions
+        view.csrf_exempt = True
+        return view
+
+    async def adispatch(self, request, *args, **kwargs):
+        self.is_async = True
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        try:
+            await to_thread(self.initial, request, *args, **kwargs)
+            handler = getattr(self,
+                              self.async_handlers[request.method.lower()])
+            response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        self.response = self.finalize_response(request, response,
+                                               *args, **kwargs)
+        return self.response
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = await to_thread(self.filter_queryset, self.get_queryset())
+        page = await self.apaginate_queryset(queryset)
+        objects = page if page is not None else await to_thread(
+            list, queryset)
+        await self.aload_related(objects)
+        data = await to_thread(getattr, self.get_serializer(
+            objects, many=True), 'data')
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        instance = await to_thread(self.get_object)
+        await self.aload_related([instance])
+        return Response(await to_thread(
+            getattr, self.get_serializer(instance), 'data'))
+
+    async def apaginate_queryset(self, queryset):
+        if self.paginator is None:
+            return None
+        return await self.paginator.apaginate_queryset(
+            queryset, self.request, view=self)
+
+    async def aload_related(self, objects):
+        pass
+
+
+class FieldSelectionMixin:
+    @cached_property
+    def field_selection(self):
+        return FieldSelection.from_request(self.request)
+
+    def get_serializer_context(self):
+        return {**super().get_serializer_context(),
+                'field_selection': self.field_selection}
+
+
+class ValuesReadMixin:
+    values_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_values_serializer(request):
+            return super().list(request, *args, **kwargs)
+        serializer = self.get_values_serializer()
+        queryset = serializer.get_queryset(self.get_values_queryset())
+        page = self.paginate_queryset(queryset)
+        rows = page if page is not None else list(queryset)
+        ids = [row['id'] for row in rows]
+        data = serializer.serialize(
+            rows, *(load(ids) for load in serializer.get_loaders()))
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        if not self.use_values_serializer(request):
+            return super().retrieve(request, *args, **kwargs)
+        serializer = self.get_values_serializer()
+        row = self.get_values_object(serializer)
+        return Response(serializer.serialize(
+            [row], *(load([row['id']])
+                     for load in serializer.get_loaders()))[0])
+
+    async def alist(self, request, *args, **kwargs):
+        if not self.use_values_serializer(request):
+            return await super().alist(request, *args, **kwargs)
+        serializer = self.get_values_serializer()
+        queryset = serializer.get_queryset(
+            await to_thread(self.get_values_queryset))
+        page = await self.apaginate_queryset(queryset)
+        rows = page if page is not None else await to_thread(
+            list, queryset)
+        ids = [row['id'] for row in rows]
+        data = serializer.serialize(rows, *await gather(
+            *((load, ids) for load in serializer.get_loaders())))
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        if not self.use_values_serializer(request):
+            return await super().aretrieve(request, *args, **kwargs)
+        serializer = self.get_values_serializer()
+        row = await to_thread(self.get_values_object, serializer)
+        return Response(serializer.serialize([row], *await gather(
+            *((load, [row['id']]) for load in serializer.get_loaders())))[0])
+
+    def use_values_serializer(self, request):
+        return (settings.FAST_RENDERING
+                and self.values_serializer_class is not None
+                and request.accepted_renderer.format == 'json')
+
+    def get_values_serializer(self):
+        return self.values_serializer_class(
+            context=self.get_serializer_context())
+
+    def get_values_queryset(self):
+        return self.filter_queryset(self.get_queryset())
+
+    def get_values_object(self, serializer):
+        queryset = serializer.get_queryset(self.get_values_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        row = get_object_or_404(
+            queryset, **{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        self.check_object_permissions(self.request, row)
+        return row
+
 
-class CustomViewMixin(ListModelMixin,
+class CustomViewMixin(AsyncReadMixin,
+                      ListModelMixin,
                       RetrieveModelMixin,
                       GenericViewSet):
     pass
+
+
+class AnonymousCacheMixin:
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(super().list,
+                                        request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(super().retrieve,
+                                        request, *args, **kwargs)
+
+    async def alist(self, request, *args, **kwargs):
+        return await self.aget_cached_response(super().alist,
+                                               request, *args, **kwargs)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return await self.aget_cached_response(super().aretrieve,
+                                               request, *args, **kwargs)
+
+    def get_cached_response(self, handler, request, *args, **kwargs):
+        if not self.is_response_cacheable(request):
+            return handler(request, *args, **kwargs)
+        key, data = self.get_cached_data(request)
+        if data is not None:
+            return Response(data)
+        versions = get_versions(self.get_cache_scope(request, **kwargs))
+        response = handler(request, *args, **kwargs)
+        self.set_cached_data(key, versions, response)
+        return response
+
+    async def aget_cached_response(self, handler, request, *args, **kwargs):
+        if not self.is_response_cacheable(request):
+            return await handler(request, *args, **kwargs)
+        key, data = await to_thread(self.get_cached_data, request)
+        if data is not None:
+            return Response(data)
+        versions = await to_thread(
+            get_versions, self.get_cache_scope(request, **kwargs))
+        response = await handler(request, *args, **kwargs)
+        await to_thread(self.set_cached_data, key, versions, response)
+        return response
+
+    def is_response_cacheable(self, request):
+        return (not request.user.is_authenticated
+                and settings.RESPONSE_CACHE_TIMEOUT)
+
+    def get_cached_data(self, request):
+        key = self.get_response_cache_key(request)
+        entry = cache.get(key)
+        if (entry is not None
+                and get_versions(list(entry['versions']))
+                == entry['versions']):
+            record_cache('response', hits=1)
+            return key, entry['data']
+        record_cache('response', misses=1)
+        return key, None
+
+    def set_cached_data(self, key, versions, response):
+        if response.status_code != 200:
+            return
+        dependencies = self.get_cache_dependencies(response.data)
+        if dependencies is None:
+            return
+        versions = {**get_versions(dependencies), **versions}
+        cache.set(key, {'versions': versions, 'data': response.data},
+                  settings.RESPONSE_CACHE_TIMEOUT)
+
+    def get_response_cache_key(self, request):
+        query = sorted(
+            (name, sorted(values))
+            for name, values in request.query_params.lists()
+        )
+        url = f'{request.build_absolute_uri(request.path)}?{query}'
+        return f'response:{self.basename}:{md5(url.encode()).hexdigest()}'
+
+    def get_cache_scope(self, request, **kwargs):
+        return []
+
+    def get_cache_dependencies(self, data):
+        return []
+
+
+class ConditionalGetMixin:
+    def list(self, request, *args, **kwargs):
+        return self.get_conditional_response(super().list,
+                                             request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_conditional_response(super().retrieve,
+                                             request, *args, **kwargs)
+
+    async def alist(self, request, *args, **kwargs):
+        return await self.aget_conditional_response(super().alist,
+                                                    request, *args, **kwargs)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return await self.aget_conditional_response(super().aretrieve,
+                                                    request, *args, **kwargs)
+
+    def get_conditional_response(self, handler, request, *args, **kwargs):
+        conditions = self.get_conditions(request, **kwargs)
+        if conditions is None:
+            return handler(request, *args, **kwargs)
+        if self.is_not_modified(request, *conditions):
+            response = HttpResponseNotModified()
+        else:
+            response = handler(request, *args, **kwargs)
+        return self.set_conditions(response, *conditions)
+
+    async def aget_conditional_response(self, handler, request,
+                                        *args, **kwargs):
+        conditions = await to_thread(self.get_conditions, request, **kwargs)
+        if conditions is None:
+            return await handler(request, *args, **kwargs)
+        if self.is_not_modified(request, *conditions):
+            response = HttpResponseNotModified()
+        else:
+            response = await handler(request, *args, **kwargs)
+        return self.set_conditions(response, *conditions)
+
+    def get_conditions(self, request, **kwargs):
+        validators = self.get_validators(request, **kwargs)
+        if validators is None:
+            return None
+        version_keys, timestamps = validators
+        versions = get_versions(version_keys)
+        timestamps = [*timestamps, *map(version_timestamp, versions.values())]
+        timestamps = [value for value in timestamps if value is not None]
+        etag = quote_etag(md5(repr((
+            sorted(versions.items()),
+            sorted(timestamps),
+            request.get_full_path(),
+            request.accepted_renderer.format,
+            request.user.id
+        )).encode()).hexdigest())
+        last_modified = (int(max(timestamps).timestamp())
+                         if timestamps else None)
+        return etag, last_modified
+
+    def set_conditions(self, response, etag, last_modified):
+        if response.status_code not in (200, 304):
+            return response
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def is_not_modified(self, request, etag, last_modified):
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match:
+            etags = parse_etags(if_none_match)
+            return etag in etags or '*' in etags
+        if_modified_since = parse_http_date_safe(
+            request.headers.get('If-Modified-Since', ''))
+        return (if_modified_since is not None
+                and last_modified is not None
+                and last_modified <= if_modified_since)
+
+    def get_validators(self, request, **kwargs):
+        return None
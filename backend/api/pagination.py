@@ -1,6 +1,214 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import InvalidPage, Page
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ParseError
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from api.concurrency import gather, to_thread
+from recipes.models import Recipe
 
 
 class Paginator(PageNumberPagination):
     page_size_query_param = 'limit'
     page_size = 6
+    mode_query_param = 'pagination'
+    cursor_query_param = 'cursor'
+    cursor_ordering = ('-pub_date', '-id')
+    invalid_cursor_message = 'Неверный курсор.'
+    invalid_ordering_message = 'Курсор не поддерживает такую сортировку.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.mode = self.get_mode(request)
+        if self.mode == 'cursor':
+            return self.paginate_by_cursor(queryset, request, view)
+        if self.mode == 'nocount':
+            return self.paginate_without_count(queryset, request)
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        page_size = self.get_page_size(request)
+        page_number = request.query_params.get(self.page_query_param, '1')
+        if (self.get_mode(request) != 'page' or not page_size
+                or not page_number.isdigit() or int(page_number) < 1):
+            return await to_thread(self.paginate_queryset, queryset,
+                                   request, view)
+        self.request = request
+        self.mode = 'page'
+        offset = (int(page_number) - 1) * page_size
+        count, results = await gather(
+            (queryset.count,), (list, queryset[offset:offset + page_size]))
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count = count
+        try:
+            number = paginator.validate_number(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)))
+        self.page = Page(results, number, paginator)
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        return results
+
+    def get_paginated_response(self, data):
+        if self.mode == 'cursor':
+            return Response({
+                'next': self.get_cursor_link(self.next_cursor),
+                'previous': self.get_cursor_link(self.previous_cursor),
+                'results': data,
+            })
+        if self.mode == 'nocount':
+            return Response({
+                'has_next': self.has_next,
+                'next': self.get_page_link(self.page_number + 1)
+                if self.has_next else None,
+                'previous': self.get_page_link(self.page_number - 1)
+                if self.page_number > 1 else None,
+                'results': data,
+            })
+        return super().get_paginated_response(data)
+
+    def get_mode(self, request):
+        if self.cursor_query_param in request.query_params:
+            return 'cursor'
+        return request.query_params.get(self.mode_query_param, 'page')
+
+    def paginate_without_count(self, queryset, request):
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        try:
+            self.page_number = int(
+                request.query_params.get(self.page_query_param, 1))
+        except ValueError:
+            self.page_number = 0
+        if self.page_number < 1:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=request.query_params.get(self.page_query_param),
+                message=''))
+        offset = (self.page_number - 1) * page_size
+        results = list(queryset[offset:offset + page_size + 1])
+        self.has_next = len(results) > page_size
+        return results[:page_size]
+
+    def get_page_link(self, page_number):
+        url = self.request.build_absolute_uri()
+        if page_number == 1:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, page_number)
+
+    def paginate_by_cursor(self, queryset, request, view):
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        ordering = self.get_cursor_ordering(queryset, view)
+        fields = [name.lstrip('-') for name in ordering]
+        position, reverse = self.decode_cursor(request, queryset, fields)
+        if reverse:
+            ordering = [name[1:] if name.startswith('-') else f'-{name}'
+                        for name in ordering]
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(
+                self.get_position_filter(ordering, position))
+
+        return self.get_cursor_page(list(queryset[:page_size + 1]),
+                                    page_size, fields, position, reverse)
+
+    def get_cursor_ordering(self, queryset, view):
+        ordering = list(queryset.query.order_by)
+        if not ordering:
+            return list(getattr(view, 'cursor_ordering',
+                                self.cursor_ordering))
+        if not all(isinstance(name, str) for name in ordering):
+            raise ParseError(self.invalid_ordering_message)
+        ordering = [name.replace('pk', 'id') if name.lstrip('-') == 'pk'
+                    else name for name in ordering]
+        if not any(name.lstrip('-') == 'id' for name in ordering):
+            ordering.append('-id' if ordering[-1].startswith('-') else 'id')
+        return ordering
+
+    def get_cursor_page(self, results, page_size, fields, position,
+                        reverse):
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        if reverse:
+            results.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, position is not None
+
+        self.next_cursor = self.previous_cursor = None
+        if results and has_next:
+            self.next_cursor = self.encode_cursor(results[-1], fields, False)
+        if results and has_previous:
+            self.previous_cursor = self.encode_cursor(
+                results[0], fields, True)
+        return results
+
+    def get_position_filter(self, ordering, position):
+        condition = Q()
+        for index, name in enumerate(ordering):
+            field = name.lstrip('-')
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            step = dict(zip(
+                (item.lstrip('-') for item in ordering[:index]),
+                position[:index]))
+            step[f'{field}__{lookup}'] = position[index]
+            condition |= Q(**step)
+        return condition
+
+    def encode_cursor(self, obj, fields, reverse):
+        position = [obj[field] if isinstance(obj, dict)
+                    else getattr(obj, field) for field in fields]
+        token = json.dumps({
+            'p': [value.isoformat() if isinstance(value, date) else value
+                  for value in position],
+            'r': reverse,
+        })
+        return urlsafe_b64encode(token.encode()).decode()
+
+    def decode_cursor(self, request, queryset, fields):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            cursor = json.loads(urlsafe_b64decode(token.encode()))
+            if len(cursor['p']) != len(fields):
+                raise ValueError
+            annotations = queryset.query.annotations
+            position = [
+                (annotations[field].output_field if field in annotations
+                 else queryset.model._meta.get_field(field)).to_python(value)
+                for field, value in zip(fields, cursor['p'])
+            ]
+            return position, bool(cursor['r'])
+        except (FieldDoesNotExist, KeyError, TypeError, ValueError,
+                ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_cursor_link(self, cursor):
+        if cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(),
+                                   self.cursor_query_param, cursor)
+
+
+class FeedPaginator(Paginator):
+    cursor_fields = ('pub_date', 'id')
+
+    def paginate_queryset(self, fetch_page, request, view=None):
+        self.request = request
+        self.mode = 'cursor'
+        page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(
+            request, Recipe.objects.all(), self.cursor_fields)
+        return self.get_cursor_page(
+            fetch_page(position, reverse, page_size + 1),
+            page_size, self.cursor_fields, position, reverse)
@@ -0,0 +1,60 @@
+import random
+from contextvars import ContextVar
+from hashlib import sha256
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE_NAME = 'replica_pin'
+
+use_replicas = ContextVar('use_replicas', default=False)
+
+
+def get_pin_key(credentials):
+    return f'replica_pin:{sha256(credentials.encode()).hexdigest()}'
+
+
+def get_pin_keys(request):
+    return [get_pin_key(credentials) for credentials in (
+        request.headers.get('Authorization'),
+        request.COOKIES.get(settings.SESSION_COOKIE_NAME),
+        request.COOKIES.get(PIN_COOKIE_NAME),
+    ) if credentials]
+
+
+def is_pinned(keys):
+    return bool(keys) and bool(cache.get_many(keys))
+
+
+def pin(*keys):
+    if keys:
+        cache.set_many(dict.fromkeys(keys, True),
+                       settings.REPLICA_STICKY_SECONDS)
+
+
+def pin_response(request, response):
+    value = request.COOKIES.get(PIN_COOKIE_NAME) or uuid4().hex
+    response.set_cookie(PIN_COOKIE_NAME, value,
+                        max_age=settings.REPLICA_STICKY_SECONDS,
+                        httponly=True, samesite='Lax')
+    pin(*{*get_pin_keys(request), get_pin_key(value)})
+
+
+class ReplicaRouter:
+    def __init__(self):
+        self.replicas = [alias for alias in settings.DATABASES
+                         if alias != DEFAULT_DB_ALIAS]
+
+    def db_for_read(self, model, **hints):
+        if (not self.replicas or not use_replicas.get()
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return DEFAULT_DB_ALIAS
+        return random.choice(self.replicas)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
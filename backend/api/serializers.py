@@ -1,5 +1,9 @@
+from collections import defaultdict
+
 from django.conf import settings
+from django.core.files.storage import default_storage
 from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from djoser.serializers import (
     UserCreateSerializer,
     UserSerializer
@@ -7,13 +11,16 @@ from djoser.serializers import (
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework.serializers import (
     IntegerField,
+    ListField,
     ModelSerializer,
-    PrimaryKeyRelatedField,
     ReadOnlyField,
+    Serializer,
     SerializerMethodField,
     ValidationError
 )
 
+from api.fieldsets import FieldSelection, SelectableFieldsMixin
+from recipes import shopping_list
 from recipes.models import (
     Favorite,
     Ingredient,
@@ -25,6 +32,27 @@ from recipes.models import (
 from users.models import Follow, User
 
 
+def get_image_url(name, request):
+    url = default_storage.url(name)
+    return request.build_absolute_uri(url) if request else url
+
+
+def get_image_derivatives(value, request):
+    images = {}
+    for size, formats in value.items():
+        if size == 'source':
+            continue
+        images[size] = {}
+        for extension, name in formats.items():
+            images[size][extension] = get_image_url(name, request)
+    return images
+
+
+class ImageDerivativesField(ReadOnlyField):
+    def to_representation(self, value):
+        return get_image_derivatives(value, self.context.get('request'))
+
+
 class CustomUserCreateSerializer(UserCreateSerializer):
     class Meta:
         model = User
@@ -32,10 +60,12 @@ class CustomUserCreateSerializer(UserCreateSerializer):
                   'first_name', 'last_name', 'password')
 
 
-class CustomUserSerializer(UserSerializer):
+class CustomUserSerializer(SelectableFieldsMixin, UserSerializer):
     is_subscribed = SerializerMethodField(read_only=True)
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         user = self.context.get('request').user
         return (user.is_authenticated
                 and Follow.objects.filter(user=user,
@@ -47,7 +77,7 @@ class CustomUserSerializer(UserSerializer):
                   'last_name', 'is_subscribed')
 
 
-class TagSerializer(ModelSerializer):
+class TagSerializer(SelectableFieldsMixin, ModelSerializer):
     class Meta:
         model = Tag
         fields = ('id', 'name', 'color', 'slug')
@@ -59,7 +89,7 @@ class IngredientSerializer(ModelSerializer):
         fields = ('id', 'name', 'measurement_unit')
 
 
-class IngredientInRecipeSerializer(ModelSerializer):
+class IngredientInRecipeSerializer(SelectableFieldsMixin, ModelSerializer):
     id = ReadOnlyField(source='ingredient.id')
     name = ReadOnlyField(source='ingredient.name')
     measurement_unit = ReadOnlyField(source='ingredient.measurement_unit')
@@ -70,22 +100,23 @@ class IngredientInRecipeSerializer(ModelSerializer):
 
 
 class CreateIngredientSerializer(ModelSerializer):
-    id = PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
+    id = IntegerField()
 
     class Meta:
         model = IngredientInRecipe
         fields = ('id', 'amount')
 
 
-class RecipeMinifiedSerializer(ModelSerializer):
+class RecipeMinifiedSerializer(SelectableFieldsMixin, ModelSerializer):
     image = Base64ImageField()
+    images = ImageDerivativesField(source='image_derivatives')
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'images', 'cooking_time')
 
 
-class FollowSerializer(ModelSerializer):
+class FollowSerializer(SelectableFieldsMixin, ModelSerializer):
     id = ReadOnlyField(source='author.id')
     username = ReadOnlyField(source='author.username')
     first_name = ReadOnlyField(source='author.first_name')
@@ -100,27 +131,39 @@ class FollowSerializer(ModelSerializer):
                   'is_subscribed', 'recipes', 'recipes_count')
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         user = self.context.get('request').user
         return (user.is_authenticated
                 and Follow.objects.filter(user=user,
-                                          author=obj.id).exists())
+                                          author=obj.author).exists())
 
     def get_recipes(self, obj):
+        context = {
+            'field_selection': self.get_field_selection().child('recipes')
+        }
+        if hasattr(obj.author, 'limited_recipes'):
+            return RecipeMinifiedSerializer(obj.author.limited_recipes,
+                                            many=True, context=context).data
         request = self.context.get('request')
         limit = request.query_params.get('recipes_limit')
         data = (obj.author.recipes.all()[:int(limit)]
                 if limit else obj.author.recipes.all())
 
-        return RecipeMinifiedSerializer(data, many=True).data
+        return RecipeMinifiedSerializer(data, many=True,
+                                        context=context).data
 
     def get_recipes_count(self, obj):
+        if hasattr(obj, 'recipes_count'):
+            return obj.recipes_count
         return Recipe.objects.filter(author=obj.author).count()
 
 
-class GetRecipeSerializer(ModelSerializer):
+class GetRecipeSerializer(SelectableFieldsMixin, ModelSerializer):
     author = CustomUserSerializer(read_only=True)
     tags = TagSerializer(read_only=True, many=True)
     image = Base64ImageField()
+    images = ImageDerivativesField(source='image_derivatives')
     is_favorited = SerializerMethodField()
     is_in_shopping_cart = SerializerMethodField()
     ingredients = IngredientInRecipeSerializer(
@@ -130,55 +173,186 @@ class GetRecipeSerializer(ModelSerializer):
     class Meta:
         model = Recipe
         fields = ('id', 'author', 'tags', 'ingredients',
-                  'name', 'image', 'text', 'cooking_time',
+                  'name', 'image', 'images', 'text', 'cooking_time',
                   'is_favorited', 'is_in_shopping_cart')
         read_only_fields = ('author', 'tags',
                             'is_favorited', 'is_in_shopping_cart')
 
+    def to_representation(self, instance):
+        if hasattr(instance, 'author_is_subscribed'):
+            instance.author.is_subscribed = instance.author_is_subscribed
+        return super().to_representation(instance)
+
     def get_ingredients(self, obj):
         items = IngredientInRecipe.objects.filter(recipe=obj)
         return IngredientInRecipeSerializer(items, many=True).data
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         user = self.context.get('request').user
         return (user.is_authenticated
                 and obj.shopping_carts.filter(user=user).exists())
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         user = self.context.get('request').user
         return (user.is_authenticated
                 and obj.favorites.filter(user=user).exists())
 
 
+class RecipeValuesSerializer:
+    fields = ('id', 'pub_date', 'name', 'image', 'image_derivatives', 'text',
+              'cooking_time')
+    author_fields = ('author_id', 'author__email', 'author__username',
+                     'author__first_name', 'author__last_name')
+    flags = ('is_favorited', 'is_in_shopping_cart', 'author_is_subscribed')
+
+    def __init__(self, context=None):
+        self.context = context or {}
+        self.selection = self.context.get('field_selection',
+                                          FieldSelection())
+
+    def get_queryset(self, queryset):
+        fields = self.fields
+        if self.selection.includes('author'):
+            fields += self.author_fields
+        annotations = queryset.query.annotations
+        ordering = (name.lstrip('-') for name in queryset.query.order_by
+                    if isinstance(name, str))
+        return queryset.values(
+            *fields, *(flag for flag in self.flags if flag in annotations),
+            *(name for name in ordering if name not in fields))
+
+    def get_loaders(self):
+        return self.get_tags, self.get_ingredients
+
+    def get_tags(self, ids):
+        tags = defaultdict(list)
+        if not self.selection.includes('tags'):
+            return tags
+        selection = self.selection.child('tags')
+        for recipe_id, *values in Tag.objects.filter(
+                recipe__in=ids).values_list(
+                'recipe', 'id', 'name', 'color', 'slug'):
+            tags[recipe_id].append(selection.select(
+                dict(zip(('id', 'name', 'color', 'slug'), values))))
+        return tags
+
+    def get_ingredients(self, ids):
+        ingredients = defaultdict(list)
+        if not self.selection.includes('ingredients'):
+            return ingredients
+        selection = self.selection.child('ingredients')
+        for recipe_id, *values in IngredientInRecipe.objects.filter(
+                recipe__in=ids).values_list(
+                'recipe_id', 'ingredient_id', 'ingredient__name',
+                'ingredient__measurement_unit', 'amount'):
+            ingredients[recipe_id].append(selection.select(dict(zip(
+                ('id', 'name', 'measurement_unit', 'amount'), values))))
+        return ingredients
+
+    def to_representation(self, row, tags, ingredients):
+        request = self.context.get('request')
+        return self.selection.select({
+            'id': row['id'],
+            'author': self.selection.child('author').select({
+                'id': row['author_id'],
+                'email': row['author__email'],
+                'username': row['author__username'],
+                'first_name': row['author__first_name'],
+                'last_name': row['author__last_name'],
+                'is_subscribed': row.get('author_is_subscribed', False),
+            }) if 'author_id' in row else None,
+            'tags': tags.get(row['id'], []),
+            'ingredients': ingredients.get(row['id'], []),
+            'name': row['name'],
+            'image': get_image_url(row['image'], request)
+            if row['image'] else None,
+            'images': get_image_derivatives(row['image_derivatives'],
+                                            request),
+            'text': row['text'],
+            'cooking_time': row['cooking_time'],
+            'is_favorited': row.get('is_favorited', False),
+            'is_in_shopping_cart': row.get('is_in_shopping_cart', False),
+        })
+
+    def serialize(self, rows, tags, ingredients):
+        return [self.to_representation(row, tags, ingredients)
+                for row in rows]
+
+
 class CreateRecipeSerializer(ModelSerializer):
-    tags = PrimaryKeyRelatedField(many=True, queryset=Tag.objects.all())
+    tags = ListField(child=IntegerField())
     ingredients = CreateIngredientSerializer(many=True)
     image = Base64ImageField()
-    cooking_time = IntegerField()
+    cooking_time = IntegerField(
+        min_value=1,
+        max_value=settings.INGREDIENT_MAX_VALUE,
+        error_messages={
+            'min_value': 'Минимальное время приготовления 1 минута.',
+            'max_value': 'Время приготовления не может превышать 24 часа.',
+        })
 
     class Meta:
         model = Recipe
         fields = ('id', 'name', 'tags', 'ingredients',
                   'text', 'image', 'cooking_time')
 
-    def validate_cooking_time(self, data):
-        cooking_time = data.get('cooking_time')
-        if (cooking_time
-                and int(cooking_time) > settings.INGREDIENT_MAX_VALUE):
+    def validate_tags(self, value):
+        if not value:
+            raise ValidationError('Добавьте хотя бы один тег.')
+        if len(set(value)) != len(value):
+            raise ValidationError('Теги не должны повторяться.')
+        missing = set(value) - set(Tag.objects.in_bulk(value))
+        if missing:
             raise ValidationError(
-                'Время приготовления не может превышать 24 часа.'
+                f'Теги не найдены: {", ".join(map(str, missing))}.'
             )
-        return data
-
-    def create_tags(self, tags, recipe):
-        for tag in tags:
-            recipe.tags.add(tag)
+        return value
+
+    def validate_ingredients(self, value):
+        if not value:
+            raise ValidationError('Добавьте хотя бы один ингредиент.')
+        ids = [item['id'] for item in value]
+        if len(set(ids)) != len(ids):
+            raise ValidationError('Ингредиенты не должны повторяться.')
+        missing = set(ids) - set(Ingredient.objects.in_bulk(ids))
+        if missing:
+            raise ValidationError(
+                f'Ингредиенты не найдены: {", ".join(map(str, missing))}.'
+            )
+        return value
 
     def create_ingredients(self, ingredients, recipe):
-        for item in ingredients:
-            IngredientInRecipe.objects.get_or_create(recipe=recipe,
-                                                     ingredient=item['id'],
-                                                     amount=item['amount'])
+        IngredientInRecipe.objects.bulk_create(
+            IngredientInRecipe(recipe=recipe,
+                               ingredient_id=item['id'],
+                               amount=item['amount'])
+            for item in ingredients
+        )
+
+    def update_ingredients(self, ingredients, recipe):
+        rows = {row.ingredient_id: row
+                for row in recipe.recipe_ingredient.all()}
+        old_amounts = {ingredient: row.amount
+                       for ingredient, row in rows.items()}
+        amounts = {item['id']: item['amount'] for item in ingredients}
+        updated = []
+        for ingredient, amount in amounts.items():
+            row = rows.pop(ingredient, None)
+            if row is not None and row.amount != amount:
+                row.amount = amount
+                updated.append(row)
+        self.create_ingredients(
+            (item for item in ingredients
+             if item['id'] not in old_amounts), recipe)
+        IngredientInRecipe.objects.bulk_update(updated, ('amount',))
+        if rows:
+            IngredientInRecipe.objects.filter(
+                id__in=[row.id for row in rows.values()]).delete()
+        shopping_list.change_recipe(recipe.id, old_amounts, amounts)
 
     @transaction.atomic
     def create(self, validated_data):
@@ -186,21 +360,26 @@ class CreateRecipeSerializer(ModelSerializer):
         tags_items = validated_data.pop('tags')
         recipe = Recipe.objects.create(**validated_data)
         self.create_ingredients(ingredients_items, recipe)
-        self.create_tags(tags_items, recipe)
+        recipe.tags.add(*tags_items)
+        recipe.is_favorited = recipe.is_in_shopping_cart = False
+        recipe.author_is_subscribed = False
         return recipe
 
     @transaction.atomic
     def update(self, instance, validated_data):
-        instance.tags.clear()
-        instance.ingredients.clear()
-        tags_items = validated_data.pop('tags')
-        ingredients_items = validated_data.pop('ingredients')
-        instance.tags.set(tags_items)
-        self.create_ingredients(ingredients_items, instance)
-        self.create_tags(tags_items, instance)
+        tags_items = validated_data.pop('tags', None)
+        ingredients_items = validated_data.pop('ingredients', None)
+        if tags_items is not None:
+            instance.tags.set(tags_items)
+        if ingredients_items is not None:
+            self.update_ingredients(ingredients_items, instance)
         return super().update(instance, validated_data)
 
     def to_representation(self, instance):
+        prefetch_related_objects([instance], 'tags', Prefetch(
+            'recipe_ingredient',
+            queryset=IngredientInRecipe.objects.select_related('ingredient')
+        ))
         context = {'request': self.context.get('request')}
         return GetRecipeSerializer(instance, context=context).data
 
@@ -216,8 +395,23 @@ class ShoppingCartSerializer(BaseShoppingCartAndFavoriteSerializer):
         model = ShoppingCart
         fields = ('user', 'recipe')
 
+    @transaction.atomic
+    def create(self, validated_data):
+        shopping_cart = super().create(validated_data)
+        shopping_list.add_recipe(shopping_cart.user_id,
+                                 shopping_cart.recipe_id)
+        return shopping_cart
+
 
 class FavoriteSerializer(BaseShoppingCartAndFavoriteSerializer):
     class Meta:
         model = Favorite
         fields = ('user', 'recipe')
+
+
+class BatchSerializer(Serializer):
+    ids = ListField(child=IntegerField(min_value=1), allow_empty=False,
+                    max_length=settings.BATCH_MAX_SIZE)
+
+    def validate_ids(self, value):
+        return list(dict.fromkeys(value))
@@ -0,0 +1,193 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save
+)
+from django.dispatch import receiver
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from api.authentication import invalidate_tokens
+from api.indexes import ingredient_index
+from api.metrics import record_event
+from api.replicas import get_pin_key, pin
+from api.versions import (
+    RECIPE_LIST_VERSION_KEY,
+    RECIPE_POPULARITY_VERSION_KEY,
+    RECIPE_SEARCH_VERSION_KEY,
+    RECIPE_UPDATE_VERSION_KEY,
+    TAG_LIST_VERSION_KEY,
+    USER_LIST_VERSION_KEY,
+    author_version_key,
+    bump_versions,
+    favorite_version_key,
+    follow_version_key,
+    recipe_version_key,
+    shopping_cart_version_key,
+    tag_version_key
+)
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    IngredientInRecipe,
+    Recipe,
+    ShoppingCart,
+    Tag
+)
+from users.models import Follow, User
+
+EVENT_NAMES = {
+    Recipe: 'recipe',
+    Favorite: 'favorite',
+    ShoppingCart: 'shopping_cart',
+    Follow: 'follow',
+    User: 'user',
+}
+
+
+def bump_on_commit(*keys):
+    if keys:
+        transaction.on_commit(lambda: bump_versions(*keys))
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredient_index(sender, instance, **kwargs):
+    transaction.on_commit(ingredient_index.invalidate)
+    bump_on_commit(*map(recipe_version_key, IngredientInRecipe.objects.filter(
+        ingredient_id=instance.id).values_list('recipe_id', flat=True)))
+
+
+@receiver((post_save, post_delete), sender=ShoppingCart)
+def invalidate_shopping_cart(sender, instance, **kwargs):
+    bump_on_commit(shopping_cart_version_key(instance.user_id))
+
+
+@receiver((post_save, post_delete), sender=IngredientInRecipe)
+def invalidate_recipe_ingredients(sender, instance, **kwargs):
+    bump_on_commit(recipe_version_key(instance.recipe_id))
+
+
+@receiver(post_save, sender=Recipe)
+def invalidate_recipe(sender, instance, created, **kwargs):
+    if created:
+        bump_on_commit(recipe_version_key(instance.id),
+                       RECIPE_LIST_VERSION_KEY,
+                       RECIPE_SEARCH_VERSION_KEY,
+                       author_version_key(instance.author_id))
+        return
+
+    def bump():
+        users = ShoppingCart.objects.filter(
+            recipe_id=instance.id).values_list('user_id', flat=True)
+        bump_versions(recipe_version_key(instance.id),
+                      RECIPE_SEARCH_VERSION_KEY,
+                      RECIPE_UPDATE_VERSION_KEY,
+                      *map(shopping_cart_version_key, users))
+    transaction.on_commit(bump)
+
+
+@receiver(pre_delete, sender=Recipe)
+def invalidate_deleted_recipe(sender, instance, **kwargs):
+    bump_on_commit(
+        RECIPE_LIST_VERSION_KEY,
+        RECIPE_SEARCH_VERSION_KEY,
+        recipe_version_key(instance.id),
+        author_version_key(instance.author_id),
+        *map(tag_version_key, instance.tags.values_list('slug', flat=True))
+    )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipe_tags(sender, instance, action, reverse, pk_set,
+                           **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        recipes = (pk_set if action != 'pre_clear'
+                   else instance.recipe_set.values_list('id', flat=True))
+        bump_on_commit(tag_version_key(instance.slug),
+                       *map(recipe_version_key, recipes))
+        return
+    tags = instance.tags.all() if action == 'pre_clear' else (
+        Tag.objects.filter(id__in=pk_set))
+    bump_on_commit(recipe_version_key(instance.id),
+                   *map(tag_version_key, tags.values_list('slug', flat=True)))
+
+
+@receiver(pre_save, sender=Tag)
+def invalidate_renamed_tag(sender, instance, **kwargs):
+    if instance.id is not None:
+        bump_on_commit(*map(tag_version_key, Tag.objects.filter(
+            id=instance.id).values_list('slug', flat=True)))
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def invalidate_tag(sender, instance, **kwargs):
+    bump_on_commit(TAG_LIST_VERSION_KEY, tag_version_key(instance.slug))
+
+
+@receiver(post_save, sender=User)
+def invalidate_author(sender, instance, update_fields, **kwargs):
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    bump_on_commit(USER_LIST_VERSION_KEY, author_version_key(instance.id))
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_tokens(sender, instance, created, update_fields,
+                           **kwargs):
+    if created or update_fields and set(update_fields) <= {'last_login'}:
+        return
+    keys = list(Token.objects.filter(user_id=instance.id).values_list(
+        'key', flat=True))
+    if keys:
+        transaction.on_commit(lambda: invalidate_tokens(*keys))
+
+
+@receiver(post_save, sender=Token)
+def pin_created_token(sender, instance, created, **kwargs):
+    if created and settings.DB_REPLICAS:
+        key = get_pin_key(f'{TokenAuthentication.keyword} {instance.key}')
+        transaction.on_commit(lambda: pin(key))
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    key = instance.key
+    transaction.on_commit(lambda: invalidate_tokens(key))
+
+
+@receiver((post_save, post_delete), sender=Favorite)
+def invalidate_favorites(sender, instance, **kwargs):
+    bump_on_commit(favorite_version_key(instance.user_id),
+                   RECIPE_POPULARITY_VERSION_KEY)
+
+
+@receiver((post_save, post_delete), sender=Follow)
+def invalidate_follows(sender, instance, **kwargs):
+    bump_on_commit(follow_version_key(instance.user_id))
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_save, sender=Follow)
+@receiver(post_save, sender=User)
+def count_created(sender, instance, created, **kwargs):
+    if created:
+        event = f'{EVENT_NAMES[sender]}_created'
+        transaction.on_commit(lambda: record_event(event))
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_delete, sender=Follow)
+@receiver(post_delete, sender=User)
+def count_deleted(sender, instance, **kwargs):
+    event = f'{EVENT_NAMES[sender]}_deleted'
+    transaction.on_commit(lambda: record_event(event))
@@ -1,6 +1,8 @@
-from django.urls import include, path
+from django.conf import settings
+from django.urls import URLPattern, include, path
 from rest_framework.routers import DefaultRouter
 
+from api.mixins import AsyncReadMixin
 from api.views import (
     CustomUserViewSet,
     IngredientViewSet,
@@ -17,8 +19,25 @@ router_v1.register(r'tags', TagViewSet, basename='tags')
 router_v1.register(r'ingredients', IngredientViewSet, basename='ingredients')
 router_v1.register(r'recipes', RecipeViewSet, basename='recipes')
 
+
+def get_async_urls(patterns):
+    return [
+        URLPattern(pattern.pattern,
+                   pattern.callback.cls.as_async_view(pattern.callback),
+                   pattern.default_args, pattern.name)
+        if issubclass(getattr(pattern.callback, 'cls', object),
+                      AsyncReadMixin)
+        else pattern
+        for pattern in patterns
+    ]
+
+
+router_urls = router_v1.urls
+if settings.ASYNC_READ_VIEWS:
+    router_urls = get_async_urls(router_urls)
+
 urlpatterns = [
-    path('', include(router_v1.urls)),
+    path('', include(router_urls)),
     path('', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
 ]
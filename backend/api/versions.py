@@ -0,0 +1,69 @@
+from datetime import datetime, timezone
+from time import time
+from uuid import uuid4
+
+from django.core.cache import cache
+
+from api.metrics import record_cache
+
+RECIPE_LIST_VERSION_KEY = 'recipe_list_version'
+RECIPE_POPULARITY_VERSION_KEY = 'recipe_popularity_version'
+RECIPE_SEARCH_VERSION_KEY = 'recipe_search_version'
+RECIPE_UPDATE_VERSION_KEY = 'recipe_update_version'
+TAG_LIST_VERSION_KEY = 'tag_list_version'
+USER_LIST_VERSION_KEY = 'user_list_version'
+
+
+def new_version():
+    return f'{time():.6f}:{uuid4().hex[:8]}'
+
+
+def version_timestamp(version):
+    try:
+        return datetime.fromtimestamp(float(version.split(':')[0]),
+                                      tz=timezone.utc)
+    except ValueError:
+        return None
+
+
+def get_version(key):
+    return cache.get_or_set(key, new_version, None)
+
+
+def get_versions(keys):
+    versions = cache.get_many(keys)
+    missing = {key: new_version() for key in keys if key not in versions}
+    record_cache('versions', hits=len(versions), misses=len(missing))
+    if missing:
+        cache.set_many(missing, None)
+    versions.update(missing)
+    return versions
+
+
+def bump_versions(*keys):
+    version = new_version()
+    cache.set_many({key: version for key in keys}, None)
+
+
+def shopping_cart_version_key(user_id):
+    return f'shopping_cart_version:{user_id}'
+
+
+def recipe_version_key(recipe_id):
+    return f'recipe_version:{recipe_id}'
+
+
+def author_version_key(user_id):
+    return f'author_version:{user_id}'
+
+
+def tag_version_key(slug):
+    return f'tag_version:{slug}'
+
+
+def favorite_version_key(user_id):
+    return f'favorite_version:{user_id}'
+
+
+def follow_version_key(user_id):
+    return f'follow_version:{user_id}'
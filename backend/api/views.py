@@ -1,49 +1,113 @@
-from django.db.models import Sum
+from functools import partial
+from hashlib import md5
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import (
+    BooleanField,
+    Exists,
+    F,
+    OuterRef,
+    Prefetch,
+    prefetch_related_objects,
+    Value,
+    Window
+)
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce, RowNumber
 from django_filters.rest_framework import DjangoFilterBackend
-from django.http import HttpResponse
+from django.http import (
+    HttpResponse,
+    HttpResponseNotModified,
+    StreamingHttpResponse
+)
 from django.shortcuts import get_object_or_404
+from django.utils.http import quote_etag
 from djoser.views import UserViewSet
 
 from rest_framework import status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.filters import SearchFilter
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 
-from api.filters import IngredientFilter, RecipeFilter
-from api.mixins import CustomViewMixin
-from api.pagination import Paginator
+from api import batch
+from api.concurrency import gather, to_thread
+from api.exporters import EXPORT_FORMATS
+from api.filters import IngredientFilter, RecipeFilter, RecipeOrderingFilter
+from api.indexes import ingredient_index
+from api.mixins import (
+    AnonymousCacheMixin,
+    AsyncReadMixin,
+    ConditionalGetMixin,
+    CustomViewMixin,
+    FieldSelectionMixin,
+    ValuesReadMixin
+)
+from api.negotiation import IgnoreFormatContentNegotiation
+from api.pagination import FeedPaginator, Paginator
 from api.permissions import IsAuthorOrAdminOrReadOnly
 from api.serializers import (
+    BatchSerializer,
     CreateRecipeSerializer,
     CustomUserSerializer,
     FavoriteSerializer,
     IngredientSerializer,
+    RecipeMinifiedSerializer,
     ShoppingCartSerializer,
     FollowSerializer,
     GetRecipeSerializer,
+    RecipeValuesSerializer,
     TagSerializer
 )
+from api.versions import (
+    RECIPE_LIST_VERSION_KEY,
+    RECIPE_POPULARITY_VERSION_KEY,
+    RECIPE_SEARCH_VERSION_KEY,
+    RECIPE_UPDATE_VERSION_KEY,
+    TAG_LIST_VERSION_KEY,
+    USER_LIST_VERSION_KEY,
+    author_version_key,
+    favorite_version_key,
+    follow_version_key,
+    get_version,
+    recipe_version_key,
+    shopping_cart_version_key,
+    tag_version_key
+)
+from recipes import counters, shopping_list, timeline
 from recipes.models import (
     Favorite,
     Ingredient,
     IngredientInRecipe,
     Recipe,
     ShoppingCart,
+    ShoppingListItem,
     Tag
 )
+from recipes.similarity import similarity_index
 from users.models import Follow, User
 
 
-class TagViewSet(CustomViewMixin):
+def get_batch_ids(request):
+    serializer = BatchSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    return serializer.validated_data['ids']
+
+
+class TagViewSet(ConditionalGetMixin, CustomViewMixin):
     serializer_class = TagSerializer
     queryset = Tag.objects.all()
     permission_classes = (IsAuthorOrAdminOrReadOnly,)
     pagination_class = None
 
+    def get_validators(self, request, **kwargs):
+        return [TAG_LIST_VERSION_KEY], []
+
 
-class IngredientViewSet(CustomViewMixin):
+class IngredientViewSet(ConditionalGetMixin, CustomViewMixin):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = (IsAuthorOrAdminOrReadOnly,)
@@ -51,53 +115,301 @@ class IngredientViewSet(CustomViewMixin):
     filterset_class = IngredientFilter
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        if request.accepted_renderer.format != 'json':
+            return super().list(request, *args, **kwargs)
+        return self.get_conditional_response(self.search_index, request)
+
+    async def alist(self, request, *args, **kwargs):
+        if request.accepted_renderer.format != 'json':
+            return await super().alist(request, *args, **kwargs)
+        return await self.aget_conditional_response(self.asearch_index,
+                                                    request)
+
+    async def asearch_index(self, request):
+        return await to_thread(self.search_index, request)
+
+    def search_index(self, request):
+        return HttpResponse(
+            ingredient_index.search(request.query_params.get('name', '')),
+            content_type='application/json'
+        )
+
+    def get_validators(self, request, **kwargs):
+        return [ingredient_index.version_key], []
 
-class CustomUserViewSet(UserViewSet):
+
+class CustomUserViewSet(ConditionalGetMixin, FieldSelectionMixin,
+                        UserViewSet):
     queryset = User.objects.all()
     serializer_class = CustomUserSerializer
     permission_classes = (IsAuthenticated,)
     pagination_class = Paginator
+    cursor_ordering = ('id',)
     lookup_field = 'id'
 
+    def get_validators(self, request, **kwargs):
+        if self.action == 'list':
+            keys = [USER_LIST_VERSION_KEY]
+        elif self.action == 'me':
+            keys = [author_version_key(request.user.id)]
+        else:
+            keys = [author_version_key(kwargs.get('id'))]
+        if request.user.is_authenticated:
+            keys.append(follow_version_key(request.user.id))
+        return keys, []
+
     @action(detail=True, methods=('POST', 'DELETE'))
     def subscribe(self, request, id=None):
         user = request.user
         author = get_object_or_404(User, id=id)
 
         if request.method == 'POST':
-            folllowing = Follow.objects.create(user=user, author=author)
-            serializer = FollowSerializer(folllowing,
-                                          context={'request': request})
+            with transaction.atomic():
+                counters.lock_users([user.id])
+                folllowing = Follow.objects.create(user=user, author=author)
+                counters.change_user_counters(author.id, followers_count=1)
+                timeline.backfill(user.id, author.id)
+            folllowing = self._get_subscriptions(
+                Follow.objects.filter(id=folllowing.id)).get()
+            self._prefetch_recipes([folllowing])
+            serializer = FollowSerializer(
+                folllowing, context=self.get_serializer_context())
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-        folllowing = get_object_or_404(Follow, user=user, author=author)
-        folllowing.delete()
+        with transaction.atomic():
+            counters.lock_users([user.id])
+            folllowing = get_object_or_404(Follow, user=user, author=author)
+            folllowing.delete()
+            counters.change_user_counters(author.id, followers_count=-1)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @action(detail=False, methods=('POST', 'DELETE'),
+            url_path='subscribe/batch')
+    def subscribe_batch(self, request):
+        ids = get_batch_ids(request)
+        user_id = request.user.id
+        with transaction.atomic():
+            if request.method == 'POST':
+                authors = set(User.objects.filter(id__in=ids).exclude(
+                    id=user_id).values_list('id', flat=True))
+                created, existing = batch.add_relations(
+                    Follow, user_id, 'author_id',
+                    [pk for pk in ids if pk in authors],
+                    [follow_version_key(user_id)])
+                counters.change_many_user_counters(created,
+                                                   followers_count=1)
+                for author_id in created:
+                    timeline.backfill(user_id, author_id)
+                statuses = batch.get_statuses(ids, created=created,
+                                              exists=existing)
+            else:
+                deleted = batch.remove_relations(Follow, user_id,
+                                                 'author_id', ids)
+                counters.change_many_user_counters(deleted,
+                                                   followers_count=-1)
+                statuses = batch.get_statuses(ids, deleted=deleted)
+        return Response(statuses)
+
     @action(detail=False, methods=('GET',))
     def subscriptions(self, request):
-        folllowing = Follow.objects.filter(user=request.user)
+        folllowing = self._get_subscriptions(
+            Follow.objects.filter(user=request.user))
         page = self.paginate_queryset(folllowing)
+        self._prefetch_recipes(page)
         serializer = FollowSerializer(page,
                                       many=True,
-                                      context={'request': request})
+                                      context=self.get_serializer_context())
         return self.get_paginated_response(serializer.data)
 
+    def _get_subscriptions(self, queryset):
+        queryset = queryset.select_related('author').annotate(
+            is_subscribed=Value(True, output_field=BooleanField())
+        ).order_by('id')
+        if not self.field_selection.includes('recipes_count'):
+            return queryset
+        return queryset.annotate(
+            recipes_count=Coalesce(F('author__stats__recipes_count'), 0))
 
-class RecipeViewSet(ModelViewSet):
+    def _prefetch_recipes(self, follows):
+        if not follows or not self.field_selection.includes('recipes'):
+            return
+        recipes = Recipe.objects.all()
+        limit = self.request.query_params.get('recipes_limit')
+        if limit and limit.isdigit():
+            ranked = Recipe.objects.filter(
+                author__in=[item.author_id for item in follows]
+            ).annotate(row_number=Window(
+                RowNumber(),
+                partition_by=[F('author')],
+                order_by=[F('pub_date').desc(), F('id').desc()]
+            )).values('id', 'row_number')
+            sql, params = ranked.query.sql_with_params()
+            recipes = recipes.filter(id__in=RawSQL(
+                f'SELECT ranked.id FROM ({sql}) ranked '
+                f'WHERE ranked.row_number <= %s',
+                (*params, int(limit))
+            ))
+        prefetch_related_objects(follows, Prefetch(
+            'author__recipes', queryset=recipes, to_attr='limited_recipes'))
+
+
+class RecipeViewSet(ConditionalGetMixin,
+                    AnonymousCacheMixin,
+                    FieldSelectionMixin,
+                    ValuesReadMixin,
+                    AsyncReadMixin,
+                    ModelViewSet):
     queryset = Recipe.objects.all()
+    values_serializer_class = RecipeValuesSerializer
     permission_classes = (IsAuthorOrAdminOrReadOnly,)
-    filter_backends = (DjangoFilterBackend,)
+    filter_backends = (DjangoFilterBackend, RecipeOrderingFilter)
     filterset_class = RecipeFilter
+    ordering_fields = ('pub_date', 'favorites_count')
     pagination_class = Paginator
     http_method_names = ['get', 'post', 'patch', 'delete']
 
+    def get_queryset(self):
+        queryset = Recipe.objects.all()
+        if self.field_selection.includes('author'):
+            queryset = queryset.select_related('author')
+        if self.is_async:
+            return queryset
+        return self.annotate_flags(
+            queryset.prefetch_related(*self.get_prefetches()))
+
+    def get_values_queryset(self):
+        return self.annotate_flags(self.filter_queryset(Recipe.objects.all()))
+
+    def annotate_flags(self, queryset):
+        return queryset.annotate(**{
+            name: Exists(flag_queryset.filter(**{field: OuterRef(outer)}))
+            for name, (flag_queryset, field, outer)
+            in self.get_flags().items()
+        })
+
+    def get_flags(self):
+        user = self.request.user
+        if not user.is_authenticated:
+            return {}
+        flags = {
+            'is_favorited': (Favorite.objects.filter(user=user),
+                             'recipe_id', 'id'),
+            'is_in_shopping_cart': (ShoppingCart.objects.filter(user=user),
+                                    'recipe_id', 'id'),
+            'author_is_subscribed': (Follow.objects.filter(user=user),
+                                     'author_id', 'author_id'),
+        }
+        paths = {'author_is_subscribed': 'author.is_subscribed'}
+        return {name: flag for name, flag in flags.items()
+                if self.field_selection.includes(paths.get(name, name))}
+
+    def get_prefetches(self):
+        prefetches = {
+            'tags': Prefetch('tags', queryset=Tag.objects.all()),
+            'ingredients': Prefetch(
+                'recipe_ingredient',
+                queryset=IngredientInRecipe.objects.select_related(
+                    'ingredient')),
+        }
+        return [prefetch for name, prefetch in prefetches.items()
+                if self.field_selection.includes(name)]
+
+    async def aload_related(self, recipes):
+        if not recipes:
+            return
+        for recipe in recipes:
+            recipe._prefetched_objects_cache = {}
+        prefetches = self.get_prefetches()
+        flags = self.get_flags()
+        calls = [(prefetch_related_objects, recipes, prefetch)
+                 for prefetch in prefetches]
+        calls += [
+            (list, flag_queryset.filter(**{
+                f'{field}__in': {getattr(recipe, outer) for recipe in recipes}
+            }).values_list(field, flat=True))
+            for flag_queryset, field, outer in flags.values()
+        ]
+        results = await gather(*calls)
+        for (name, (_, _, outer)), values in zip(
+                flags.items(), results[len(prefetches):]):
+            values = set(values)
+            for recipe in recipes:
+                setattr(recipe, name, getattr(recipe, outer) in values)
+
+    def get_validators(self, request, **kwargs):
+        keys = [TAG_LIST_VERSION_KEY, ingredient_index.version_key]
+        timestamps = []
+        if self.action == 'retrieve':
+            if not str(kwargs['pk']).isdigit():
+                return None
+            recipe = Recipe.objects.filter(pk=kwargs['pk']).values_list(
+                'author_id', 'updated_at').first()
+            if recipe is None:
+                return None
+            author_id, updated_at = recipe
+            keys += [recipe_version_key(kwargs['pk']),
+                     author_version_key(author_id)]
+            timestamps.append(updated_at)
+        else:
+            keys += [RECIPE_LIST_VERSION_KEY, RECIPE_UPDATE_VERSION_KEY,
+                     USER_LIST_VERSION_KEY]
+            if 'search' in request.query_params:
+                keys.append(RECIPE_SEARCH_VERSION_KEY)
+            if 'ordering' in request.query_params:
+                keys.append(RECIPE_POPULARITY_VERSION_KEY)
+        user = request.user
+        if user.is_authenticated:
+            keys += [favorite_version_key(user.id),
+                     shopping_cart_version_key(user.id),
+                     follow_version_key(user.id)]
+        return keys, timestamps
+
+    def get_cache_scope(self, request, **kwargs):
+        if self.action == 'retrieve':
+            return [recipe_version_key(kwargs['pk'])]
+        keys = [tag_version_key(slug)
+                for slug in request.query_params.getlist('tags')]
+        if 'author' in request.query_params:
+            keys.append(author_version_key(request.query_params['author']))
+        if 'search' in request.query_params:
+            keys.append(RECIPE_SEARCH_VERSION_KEY)
+        if not keys:
+            keys.append(RECIPE_LIST_VERSION_KEY)
+        if 'ordering' in request.query_params:
+            keys.append(RECIPE_POPULARITY_VERSION_KEY)
+        return keys
+
+    def get_cache_dependencies(self, data):
+        recipes = data.get('results', [data]) if isinstance(
+            data, dict) else data
+        keys = set()
+        for recipe in recipes:
+            author = recipe.get('author')
+            if 'id' not in recipe or author is not None and 'id' not in author:
+                return None
+            keys.add(recipe_version_key(recipe['id']))
+            if author is not None:
+                keys.add(author_version_key(author['id']))
+            keys.update(tag_version_key(tag['slug'])
+                        for tag in recipe.get('tags', ()) if 'slug' in tag)
+        return list(keys)
+
+    @transaction.atomic
     def perform_create(self, serializer):
-        return serializer.save(author=self.request.user)
+        recipe = serializer.save(author=self.request.user)
+        counters.change_user_counters(recipe.author_id, recipes_count=1)
+        return recipe
 
     def perform_update(self, serializer):
         return serializer.save(author=self.request.user)
 
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        shopping_list.remove_recipe(instance.id)
+        instance.delete()
+        counters.change_user_counters(instance.author_id, recipes_count=-1)
+
     def get_serializer_class(self):
         if self.request.method == 'GET':
             return GetRecipeSerializer
@@ -105,52 +417,190 @@ class RecipeViewSet(ModelViewSet):
 
     @action(detail=True, methods=('POST',))
     def shopping_cart(self, request, pk):
-        return self._add_recipe(request, pk, ShoppingCartSerializer)
+        return self._add_recipe(request, pk, ShoppingCartSerializer,
+                                'in_carts_count')
 
     @shopping_cart.mapping.delete
     def delete_from_shopping_cart(self, request, pk):
-        get_object_or_404(ShoppingCart,
-                          recipe__id=pk,
-                          user=request.user).delete()
+        with transaction.atomic():
+            counters.lock_users([request.user.id])
+            shopping_cart = get_object_or_404(ShoppingCart,
+                                              recipe__id=pk,
+                                              user=request.user)
+            shopping_list.remove_recipe(pk, request.user.id)
+            shopping_cart.delete()
+            counters.change_recipe_counters(pk, in_carts_count=-1)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @action(detail=False, methods=('POST', 'DELETE'),
+            url_path='shopping_cart/batch',
+            permission_classes=(IsAuthenticated,))
+    def shopping_cart_batch(self, request):
+        ids = get_batch_ids(request)
+        user_id = request.user.id
+        with transaction.atomic():
+            if request.method == 'POST':
+                created, statuses = self._add_recipes(
+                    ShoppingCart, ids, 'in_carts_count',
+                    [shopping_cart_version_key(user_id)])
+                shopping_list.add_recipes(user_id, created)
+            else:
+                deleted, statuses = self._remove_recipes(
+                    ShoppingCart, ids, 'in_carts_count')
+                shopping_list.remove_recipes(user_id, deleted)
+        return Response(statuses)
+
+    @action(detail=False, methods=('DELETE',),
+            url_path='shopping_cart/clear',
+            permission_classes=(IsAuthenticated,))
+    def clear_shopping_cart(self, request):
+        user_id = request.user.id
+        with transaction.atomic():
+            counters.lock_users([user_id])
+            carts = ShoppingCart.objects.filter(user_id=user_id)
+            deleted = list(carts.values_list('recipe_id', flat=True))
+            if deleted:
+                shopping_list.clear(user_id)
+                carts.delete()
+                counters.change_many_recipe_counters(deleted,
+                                                     in_carts_count=-1)
+        return Response(batch.get_statuses(deleted, deleted=deleted))
+
+    @action(detail=False, methods=('POST', 'DELETE'),
+            url_path='favorite/batch',
+            permission_classes=(IsAuthenticated,))
+    def favorite_batch(self, request):
+        ids = get_batch_ids(request)
+        with transaction.atomic():
+            if request.method == 'POST':
+                _, statuses = self._add_recipes(
+                    Favorite, ids, 'favorites_count',
+                    [favorite_version_key(request.user.id),
+                     RECIPE_POPULARITY_VERSION_KEY])
+            else:
+                _, statuses = self._remove_recipes(Favorite, ids,
+                                                   'favorites_count')
+        return Response(statuses)
+
     @action(detail=True, methods=('POST',))
     def favorite(self, request, pk):
-        return self._add_recipe(request, pk, FavoriteSerializer)
+        return self._add_recipe(request, pk, FavoriteSerializer,
+                                'favorites_count')
 
     @favorite.mapping.delete
     def delete_from_favorite(self, request, pk):
-        get_object_or_404(Favorite,
-                          recipe=get_object_or_404(Recipe, id=pk),
-                          user=request.user).delete()
+        with transaction.atomic():
+            counters.lock_users([request.user.id])
+            get_object_or_404(Favorite,
+                              recipe=get_object_or_404(Recipe, id=pk),
+                              user=request.user).delete()
+            counters.change_recipe_counters(pk, favorites_count=-1)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
-    @action(detail=False, methods=('GET',))
+    @action(detail=True, methods=('GET',))
+    def similar(self, request, pk):
+        recipe = get_object_or_404(Recipe.objects.only('id'), id=pk)
+        limit = request.query_params.get('limit', '')
+        limit = (min(int(limit), settings.SIMILARITY_NEIGHBOURS)
+                 if limit.isdigit() else settings.SIMILAR_RECIPES_LIMIT)
+        ids = similarity_index.get_similar(recipe.id, limit)
+        recipes = Recipe.objects.in_bulk(ids)
+        serializer = RecipeMinifiedSerializer(
+            [recipes[pk] for pk in ids if pk in recipes], many=True,
+            context=self.get_serializer_context())
+        return Response(serializer.data)
+
+    @action(detail=False, methods=('GET',),
+            permission_classes=(IsAuthenticated,),
+            pagination_class=FeedPaginator)
+    def feed(self, request):
+        page = self.paginate_queryset(
+            partial(timeline.get_page, request.user.id))
+        recipes = self.get_queryset().in_bulk([item.id for item in page])
+        serializer = self.get_serializer(
+            [recipes[item.id] for item in page if item.id in recipes],
+            many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=('GET',),
+            permission_classes=(IsAuthenticated,),
+            content_negotiation_class=IgnoreFormatContentNegotiation)
     def download_shopping_cart(self, request):
-        ingredients = IngredientInRecipe.objects.filter(
-            recipe__shopping_carts__user=request.user).values(
-            'ingredient__name',
-            'ingredient__measurement_unit').annotate(amount=Sum('amount'))
+        export_format = self.get_export_format(request)
+        headers = self.get_shopping_cart_headers(export_format, (
+            get_version(shopping_cart_version_key(request.user.id)),
+            ingredient_index.get_version()
+        ))
+        if self.is_not_modified(request, headers['ETag'], None):
+            return HttpResponseNotModified(headers=headers)
+        return self.get_shopping_cart_response(
+            export_format, headers,
+            self.get_shopping_list(request).iterator())
 
-        shopping_cart_data = [
-            f"{item['ingredient__name']} - "
-            f"{item['ingredient__measurement_unit']} | "
-            f"{item['amount']}"
-            for item in ingredients
-        ]
-        shopping_cart_text = '\n'.join(shopping_cart_data)
+    async def adownload_shopping_cart(self, request):
+        export_format = self.get_export_format(request)
+        headers = self.get_shopping_cart_headers(export_format, await gather(
+            (get_version, shopping_cart_version_key(request.user.id)),
+            (ingredient_index.get_version,)
+        ))
+        if self.is_not_modified(request, headers['ETag'], None):
+            return HttpResponseNotModified(headers=headers)
+        return self.get_shopping_cart_response(
+            export_format, headers,
+            await to_thread(list, self.get_shopping_list(request)))
+
+    def get_export_format(self, request):
+        export_format = request.query_params.get('format', 'txt')
+        if export_format not in EXPORT_FORMATS:
+            raise ValidationError(
+                {'format': f'Доступные форматы: {", ".join(EXPORT_FORMATS)}.'}
+            )
+        return export_format
 
-        file = 'shopping_cart_list.txt'
-        headers = {'Content-Disposition': f'attachment; filename={file}'}
-        return HttpResponse(shopping_cart_text,
-                            content_type='text/plain; charset=UTF-8',
-                            headers=headers)
+    def get_shopping_cart_headers(self, export_format, versions):
+        etag = quote_etag(md5(':'.join(
+            (*versions, export_format)).encode()).hexdigest())
+        return {'ETag': etag, 'Cache-Control': 'private, no-cache'}
 
-    def _add_recipe(self, request, pk, serializer_class):
+    def get_shopping_list(self, request):
+        return ShoppingListItem.objects.filter(
+            user=request.user).values(
+            'ingredient__name',
+            'ingredient__measurement_unit').annotate(
+            amount=F('total_amount')).order_by('ingredient__name')
+
+    def get_shopping_cart_response(self, export_format, headers, rows):
+        exporter, content_type = EXPORT_FORMATS[export_format]
+        file = f'shopping_cart_list.{export_format}'
+        headers['Content-Disposition'] = f'attachment; filename={file}'
+        return StreamingHttpResponse(exporter(rows),
+                                     content_type=content_type,
+                                     headers=headers)
+
+    def _add_recipe(self, request, pk, serializer_class, counter):
         recipe = get_object_or_404(Recipe, id=pk)
         serializer = serializer_class(
             data={'recipe': recipe.id, 'user': request.user.id},
             context={'request': request})
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
+        with transaction.atomic():
+            counters.lock_users([request.user.id])
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+            counters.change_recipe_counters(recipe.id, **{counter: 1})
         return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def _add_recipes(self, model, ids, counter, version_keys):
+        recipes = set(Recipe.objects.filter(id__in=ids).values_list(
+            'id', flat=True))
+        created, existing = batch.add_relations(
+            model, self.request.user.id, 'recipe_id',
+            [pk for pk in ids if pk in recipes], version_keys)
+        counters.change_many_recipe_counters(created, **{counter: 1})
+        return created, batch.get_statuses(ids, created=created,
+                                           exists=existing)
+
+    def _remove_recipes(self, model, ids, counter):
+        deleted = batch.remove_relations(model, self.request.user.id,
+                                         'recipe_id', ids)
+        counters.change_many_recipe_counters(deleted, **{counter: -1})
+        return deleted, batch.get_statuses(ids, deleted=deleted)
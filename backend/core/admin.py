@@ -0,0 +1,39 @@
+from django.contrib import admin
+from django.db import transaction
+
+from core.paginators import EstimatedCountPaginator
+
+
+class ScalableModelAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class CountedModelAdmin(ScalableModelAdmin):
+    counted_field = None
+
+    def change_counters(self, ids, delta):
+        raise NotImplementedError
+
+    @transaction.atomic
+    def save_model(self, request, obj, form, change):
+        old = (type(obj).objects.values_list(
+            self.counted_field, flat=True).get(pk=obj.pk)
+            if change else None)
+        super().save_model(request, obj, form, change)
+        new = getattr(obj, self.counted_field)
+        if old != new:
+            if old is not None:
+                self.change_counters([old], -1)
+            self.change_counters([new], 1)
+
+    @transaction.atomic
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        self.change_counters([getattr(obj, self.counted_field)], -1)
+
+    @transaction.atomic
+    def delete_queryset(self, request, queryset):
+        ids = list(queryset.values_list(self.counted_field, flat=True))
+        super().delete_queryset(request, queryset)
+        self.change_counters(ids, -1)
@@ -30,6 +30,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.ReplicaMiddleware',
+    'api.middleware.MetricsMiddleware',
+    'api.middleware.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -66,10 +69,99 @@ DATABASES = {
         'USER': config('POSTGRES_USER', default='postgres', cast=str),
         'PASSWORD': config('POSTGRES_PASSWORD', default='1234', cast=str),
         'HOST': config('DB_HOST', default='db', cast=str),
-        'PORT': config('DB_PORT', default='5432', cast=int)
+        'PORT': config('DB_PORT', default='5432', cast=int),
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=0, cast=int),
     }
 }
 
+DB_REPLICAS = config('DB_REPLICAS', default='', cast=Csv())
+REPLICA_SETTING = ('NAME' if DATABASES['default']['ENGINE'].endswith(
+    'sqlite3') else 'HOST')
+for number, replica in enumerate(DB_REPLICAS, start=1):
+    DATABASES[f'replica_{number}'] = {
+        **DATABASES['default'],
+        REPLICA_SETTING: replica,
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['api.replicas.ReplicaRouter'] if DB_REPLICAS else []
+REPLICA_STICKY_SECONDS = config('REPLICA_STICKY_SECONDS', default=5, cast=int)
+
+CACHES = {
+    'default': {
+        'BACKEND': config(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache',
+            cast=str),
+        'LOCATION': config('CACHE_LOCATION', default='', cast=str),
+    }
+}
+
+RESPONSE_CACHE_TIMEOUT = config('RESPONSE_CACHE_TIMEOUT',
+                                default=300, cast=int)
+
+IMAGE_WORKERS = config('IMAGE_WORKERS', default=2, cast=int)
+
+ADMIN_COUNT_LIMIT = config('ADMIN_COUNT_LIMIT', default=10000, cast=int)
+
+TOKEN_AUTHENTICATION = {
+    'stock': 'rest_framework.authentication.TokenAuthentication',
+    'cached': 'api.authentication.CachedTokenAuthentication',
+}[config('TOKEN_AUTHENTICATION', default='stock', cast=str)]
+TOKEN_CACHE_TIMEOUT = config('TOKEN_CACHE_TIMEOUT', default=60, cast=int)
+
+FEED_FANOUT_THRESHOLD = config('FEED_FANOUT_THRESHOLD',
+                               default=1000, cast=int)
+FEED_BACKFILL_SIZE = config('FEED_BACKFILL_SIZE', default=20, cast=int)
+FEED_BATCH_SIZE = config('FEED_BATCH_SIZE', default=1000, cast=int)
+
+BATCH_MAX_SIZE = config('BATCH_MAX_SIZE', default=100, cast=int)
+
+SIMILARITY_INDEX_DIR = config('SIMILARITY_INDEX_DIR',
+                              default=str(BASE_DIR / 'similarity'))
+SIMILARITY_NEIGHBOURS = config('SIMILARITY_NEIGHBOURS', default=20, cast=int)
+SIMILARITY_TAG_WEIGHT = config('SIMILARITY_TAG_WEIGHT',
+                               default=0.2, cast=float)
+SIMILARITY_REFRESH_RATIO = config('SIMILARITY_REFRESH_RATIO',
+                                  default=0.2, cast=float)
+SIMILAR_RECIPES_LIMIT = config('SIMILAR_RECIPES_LIMIT', default=6, cast=int)
+SIMILARITY_REFRESH_INTERVAL = config('SIMILARITY_REFRESH_INTERVAL',
+                                     default=60, cast=int)
+
+METRICS_ENABLED = config('METRICS_ENABLED', default=False, cast=bool)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+ASYNC_READ_VIEWS = config('ASYNC_READ_VIEWS', default=False, cast=bool)
+
+FAST_RENDERING = config('FAST_RENDERING', default=True, cast=bool)
+
+QUERY_INSTRUMENTATION = config('QUERY_INSTRUMENTATION',
+                               default=False, cast=bool)
+QUERY_BUDGET = config('QUERY_BUDGET', default=30, cast=int)
+QUERY_BUDGET_STRICT = config('QUERY_BUDGET_STRICT', default=False, cast=bool)
+QUERY_BUDGETS = {
+    'api:recipes-list': 9,
+    'api:recipes-detail': 8,
+    'api:recipes-feed': 8,
+    'api:users-subscriptions': 6,
+    'api:ingredients-list': 3,
+    'api:tags-list': 3,
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'api.instrumentation': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -109,7 +201,11 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        TOKEN_AUTHENTICATION,
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ],
     'DEFAULT_PAGINATION_CLASS': 'api.pagination.Paginator',
     'PAGE_SIZE': 6,
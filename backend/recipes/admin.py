@@ -1,15 +1,42 @@
 from django.contrib import admin
+from django.db import transaction
 
+from core.admin import CountedModelAdmin, ScalableModelAdmin
+from recipes import counters, shopping_list
 from recipes.models import (
     Favorite,
     Ingredient,
     IngredientInRecipe,
     Recipe,
     ShoppingCart,
+    ShoppingListItem,
     Tag
 )
 
 
+class PopularityFilter(admin.SimpleListFilter):
+    title = 'Популярность'
+    parameter_name = 'popularity'
+    ranges = {
+        '0': ('Нет в избранном', 0, 1),
+        '1': ('1–9', 1, 10),
+        '10': ('10–99', 10, 100),
+        '100': ('100 и больше', 100, None),
+    }
+
+    def lookups(self, request, model_admin):
+        return [(key, label) for key, (label, _, _) in self.ranges.items()]
+
+    def queryset(self, request, queryset):
+        if self.value() not in self.ranges:
+            return queryset
+        _, start, end = self.ranges[self.value()]
+        queryset = queryset.filter(favorites_count__gte=start)
+        if end is not None:
+            queryset = queryset.filter(favorites_count__lt=end)
+        return queryset
+
+
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
     list_display = ('name', 'color', 'slug')
@@ -18,41 +45,114 @@ class TagAdmin(admin.ModelAdmin):
 
 
 @admin.register(Ingredient)
-class IngredientAdmin(admin.ModelAdmin):
+class IngredientAdmin(ScalableModelAdmin):
     list_display = ('name', 'measurement_unit')
-    list_filter = ('name',)
-    search_fields = ('name',)
+    search_fields = ('^name',)
+    ordering = ('name',)
 
 
 class IngredientInRecipeAdmin(admin.TabularInline):
     model = IngredientInRecipe
     extra = 0
     min_num = 1
+    autocomplete_fields = ('ingredient',)
 
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
-    list_display = ('name', 'author', 'favorites_count')
-    list_filter = ('name', 'author__username', 'tags__name')
+class RecipeAdmin(CountedModelAdmin):
+    list_display = ('name', 'author', 'favorites_count', 'in_carts_count')
+    list_filter = ('tags', PopularityFilter)
+    list_select_related = ('author',)
     inlines = (IngredientInRecipeAdmin,)
-    search_fields = ('name', 'author__username', 'tags__name')
-    readonly_fields = ('favorites_count',)
+    search_fields = ('name', '=author__username')
+    autocomplete_fields = ('author',)
+    readonly_fields = ('favorites_count', 'in_carts_count')
+    counted_field = 'author_id'
 
-    def favorites_count(self, obj):
-        return obj.favorites.count()
+    def change_counters(self, ids, delta):
+        counters.change_counted(counters.change_many_user_counters, ids,
+                                recipes_count=delta)
 
-    favorites_count.short_description = 'В избранных'
+    @transaction.atomic
+    def save_related(self, request, form, formsets, change):
+        recipe_id = form.instance.id
+        old_amounts = shopping_list.get_recipe_amounts(recipe_id)
+        super().save_related(request, form, formsets, change)
+        shopping_list.change_recipe(
+            recipe_id, old_amounts,
+            shopping_list.get_recipe_amounts(recipe_id))
+
+    @transaction.atomic
+    def delete_model(self, request, obj):
+        shopping_list.remove_recipe(obj.id)
+        super().delete_model(request, obj)
+
+    @transaction.atomic
+    def delete_queryset(self, request, queryset):
+        for recipe_id in queryset.values_list('id', flat=True):
+            shopping_list.remove_recipe(recipe_id)
+        super().delete_queryset(request, queryset)
 
 
 @admin.register(ShoppingCart)
-class ShoppingCartAdmin(admin.ModelAdmin):
+class ShoppingCartAdmin(CountedModelAdmin):
     list_display = ('user', 'recipe')
-    list_filter = ('recipe__tags',)
-    search_fields = ('recipe__name', 'user__username')
+    list_select_related = ('user', 'recipe')
+    search_fields = ('recipe__name', '=user__username')
+    autocomplete_fields = ('user', 'recipe')
+    counted_field = 'recipe_id'
+
+    def change_counters(self, ids, delta):
+        counters.change_counted(counters.change_many_recipe_counters, ids,
+                                in_carts_count=delta)
+
+    @transaction.atomic
+    def save_model(self, request, obj, form, change):
+        if change and not form.has_changed():
+            return
+        if change:
+            old = ShoppingCart.objects.get(id=obj.id)
+            shopping_list.remove_recipe(old.recipe_id, old.user_id)
+        super().save_model(request, obj, form, change)
+        shopping_list.add_recipe(obj.user_id, obj.recipe_id)
+
+    @transaction.atomic
+    def delete_model(self, request, obj):
+        shopping_list.remove_recipe(obj.recipe_id, obj.user_id)
+        super().delete_model(request, obj)
+
+    @transaction.atomic
+    def delete_queryset(self, request, queryset):
+        for user_id, recipe_id in queryset.values_list('user_id',
+                                                       'recipe_id'):
+            shopping_list.remove_recipe(recipe_id, user_id)
+        super().delete_queryset(request, queryset)
 
 
 @admin.register(Favorite)
-class FavoriteAdmin(admin.ModelAdmin):
+class FavoriteAdmin(CountedModelAdmin):
     list_display = ('user', 'recipe')
-    list_filter = ('recipe__tags',)
-    search_fields = ('recipe__name', 'user__username')
+    list_select_related = ('user', 'recipe')
+    search_fields = ('recipe__name', '=user__username')
+    autocomplete_fields = ('user', 'recipe')
+    counted_field = 'recipe_id'
+
+    def change_counters(self, ids, delta):
+        counters.change_counted(counters.change_many_recipe_counters, ids,
+                                favorites_count=delta)
+
+
+@admin.register(ShoppingListItem)
+class ShoppingListItemAdmin(ScalableModelAdmin):
+    list_display = ('user', 'ingredient', 'total_amount')
+    list_select_related = ('user', 'ingredient')
+    search_fields = ('=user__username', '^ingredient__name')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
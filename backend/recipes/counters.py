@@ -0,0 +1,75 @@
+from collections import Counter, defaultdict
+
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Follow, User, UserStats
+
+RECIPE_COUNTERS = {
+    'favorites_count': (Favorite, 'recipe'),
+    'in_carts_count': (ShoppingCart, 'recipe'),
+}
+USER_COUNTERS = {
+    'recipes_count': (Recipe, 'author'),
+    'followers_count': (Follow, 'author'),
+}
+
+
+def _changes(deltas):
+    return {name: Greatest(F(name) + delta, 0)
+            for name, delta in deltas.items()}
+
+
+def change_recipe_counters(recipe_id, **deltas):
+    Recipe.objects.filter(id=recipe_id).update(**_changes(deltas))
+
+
+def change_user_counters(user_id, **deltas):
+    UserStats.objects.filter(user_id=user_id).update(**_changes(deltas))
+
+
+def change_many_recipe_counters(recipe_ids, **deltas):
+    if recipe_ids:
+        Recipe.objects.filter(id__in=recipe_ids).update(**_changes(deltas))
+
+
+def change_many_user_counters(user_ids, **deltas):
+    if user_ids:
+        UserStats.objects.filter(user_id__in=user_ids).update(
+            **_changes(deltas))
+
+
+def change_counted(change, ids, **deltas):
+    groups = defaultdict(list)
+    for pk, count in Counter(ids).items():
+        groups[count].append(pk)
+    for count, pks in groups.items():
+        change(pks, **{name: delta * count for name, delta in deltas.items()})
+
+
+def lock_users(user_ids):
+    list(User.objects.select_for_update().filter(
+        id__in=user_ids).order_by('id').values_list('id', flat=True))
+
+
+def count_subquery(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+            field).annotate(count=Count('*')).values('count')
+    ), 0)
+
+
+def get_live_counters(queryset, counters):
+    return queryset.annotate(**{
+        f'live_{name}': count_subquery(model, field)
+        for name, (model, field) in counters.items()
+    })
+
+
+def get_live_user_counters():
+    return get_live_counters(User.objects.order_by('id'), USER_COUNTERS)
+
+
+def get_live_recipe_counters():
+    return get_live_counters(Recipe.objects.order_by('id'), RECIPE_COUNTERS)
@@ -0,0 +1,82 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVE_SIZES = {
+    'card': (300, 300),
+    'detail': (1200, 1200),
+}
+DERIVATIVE_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+}
+DERIVATIVES_DIR = 'recipes/images/derivatives'
+
+_executor = None
+
+
+def get_derivative_name(name, size, extension):
+    stem = os.path.splitext(os.path.basename(name))[0]
+    return f'{DERIVATIVES_DIR}/{stem}_{size}.{extension}'
+
+
+def generate_derivatives(name):
+    with default_storage.open(name) as file:
+        original = ImageOps.exif_transpose(Image.open(file))
+        original.load()
+    derivatives = {'source': name}
+    for size, dimensions in DERIVATIVE_SIZES.items():
+        image = original.copy()
+        image.thumbnail(dimensions, Image.LANCZOS)
+        derivatives[size] = {}
+        for extension, (image_format, options) in DERIVATIVE_FORMATS.items():
+            if image_format == 'JPEG' and image.mode != 'RGB':
+                image = image.convert('RGB')
+            buffer = BytesIO()
+            image.save(buffer, image_format, **options)
+            path = get_derivative_name(name, size, extension)
+            if default_storage.exists(path):
+                default_storage.delete(path)
+            derivatives[size][extension] = default_storage.save(
+                path, ContentFile(buffer.getvalue()))
+    return derivatives
+
+
+def process_recipe(recipe_id):
+    from recipes.models import Recipe
+
+    try:
+        recipe = Recipe.objects.filter(id=recipe_id).first()
+        if recipe is None or not recipe.image:
+            return
+        derivatives = generate_derivatives(recipe.image.name)
+        if not Recipe.objects.filter(id=recipe_id,
+                                     image=recipe.image.name).exists():
+            return
+        recipe.image_derivatives = derivatives
+        recipe.save(update_fields=('image_derivatives', 'updated_at'))
+    except Exception:
+        logger.exception('Не удалось обработать картинку рецепта %s',
+                         recipe_id)
+    finally:
+        close_old_connections()
+
+
+def enqueue_recipe(recipe_id):
+    global _executor
+    if not settings.IMAGE_WORKERS:
+        return process_recipe(recipe_id)
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_WORKERS,
+            thread_name_prefix='recipe-images')
+    _executor.submit(process_recipe, recipe_id)
@@ -0,0 +1,50 @@
+from time import perf_counter, sleep
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from recipes.models import Recipe
+from recipes.similarity import similarity_index
+
+
+class Command(BaseCommand):
+    help = ('Строит индекс похожих рецептов. Если индекс уже есть, '
+            'пересчитывает только рецепты, изменённые с прошлого запуска.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='Перестроить индекс целиком.')
+        parser.add_argument('--watch', action='store_true',
+                            help='Обновлять индекс каждые '
+                                 'SIMILARITY_REFRESH_INTERVAL секунд.')
+
+    def handle(self, *args, **options):
+        if not options['watch']:
+            return self.build(options['full'])
+        full = options['full']
+        while True:
+            try:
+                self.build(full)
+                full = False
+            except CommandError as error:
+                self.stderr.write(str(error))
+            close_old_connections()
+            sleep(settings.SIMILARITY_REFRESH_INTERVAL)
+
+    def build(self, full):
+        if not Recipe.objects.exists():
+            raise CommandError('Нет рецептов для индексации.')
+        start = perf_counter()
+        with similarity_index.refreshing() as acquired:
+            if not acquired:
+                raise CommandError('Индекс уже обновляется, '
+                                   'повторите позже.')
+            updated, full = similarity_index.refresh(full=full)
+        if not updated:
+            self.stdout.write('Индекс похожих рецептов актуален.')
+            return
+        kind = 'Построен заново' if full else 'Обновлён'
+        self.stdout.write(self.style.SUCCESS(
+            f'{kind} индекс похожих рецептов: пересчитано {updated} '
+            f'рецептов за {perf_counter() - start:.1f} с.'))
@@ -0,0 +1,223 @@
+import random
+from collections import defaultdict
+from datetime import timedelta
+from io import BytesIO
+from itertools import accumulate, islice
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from PIL import Image
+
+from api.versions import (
+    RECIPE_LIST_VERSION_KEY,
+    RECIPE_POPULARITY_VERSION_KEY,
+    RECIPE_SEARCH_VERSION_KEY,
+    USER_LIST_VERSION_KEY,
+    bump_versions
+)
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    IngredientInRecipe,
+    Recipe,
+    ShoppingCart,
+    Tag,
+    TimelineEntry
+)
+from recipes.search import get_backend
+from users.models import Follow, User
+
+IMAGE_NAME = 'recipes/images/synthetic.png'
+PASSWORD = 'synthetic-password'
+ADJECTIVES = ('Домашний', 'Быстрый', 'Праздничный', 'Летний', 'Зимний',
+              'Острый', 'Нежный', 'Деревенский', 'Постный', 'Сытный')
+
+
+class ZipfSampler:
+    def __init__(self, population, exponent, rng):
+        self.population = list(population)
+        rng.shuffle(self.population)
+        self.weights = list(accumulate(
+            1 / rank ** exponent
+            for rank in range(1, len(self.population) + 1)))
+        self.rng = rng
+
+    def sample(self, count):
+        return set(self.rng.choices(self.population, cum_weights=self.weights,
+                                    k=count))
+
+
+class Command(BaseCommand):
+    help = ('Генерирует синтетический набор данных: пользователей, рецепты, '
+            'избранное, списки покупок и подписки.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=5000)
+        parser.add_argument('--tags', type=int, default=10,
+                            help='Сколько тегов должно быть в базе.')
+        parser.add_argument('--favorites', type=int, default=20,
+                            help='Среднее число избранных на пользователя.')
+        parser.add_argument('--carts', type=int, default=5,
+                            help='Среднее число рецептов в списке покупок.')
+        parser.add_argument('--follows', type=int, default=10,
+                            help='Среднее число подписок на пользователя.')
+        parser.add_argument('--zipf', type=float, default=1.1,
+                            help='Показатель распределения Ципфа.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--prefix', default='synthetic',
+                            help='Префикс имён пользователей.')
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        prefix = options['prefix']
+        if User.objects.filter(username__startswith=f'{prefix}_').exists():
+            raise CommandError(
+                f'Пользователи с префиксом {prefix} уже есть, '
+                f'укажите другой --prefix.')
+        ingredients = list(Ingredient.objects.values_list('id', 'name'))
+        if not ingredients:
+            raise CommandError('Каталог ингредиентов пуст, '
+                               'сначала выполните import_data.')
+
+        tags = self._create_tags(options['tags'])
+        users = self._create_users(prefix, options['users'])
+        recipes = self._create_recipes(users, tags, ingredients,
+                                       options['recipes'], options['zipf'])
+        recipe_ids = [recipe_id for items in recipes.values()
+                      for _, recipe_id in items]
+        self._create_relations(Favorite, 'recipe_id', users, recipe_ids,
+                               options['favorites'], options['zipf'])
+        self._create_relations(ShoppingCart, 'recipe_id', users, recipe_ids,
+                               options['carts'], options['zipf'])
+        followers = self._create_relations(
+            Follow, 'author_id', users, users, options['follows'],
+            options['zipf'])
+        self._create_timelines(recipes, followers)
+
+        call_command('reconcile_counters', stdout=self.stdout)
+        call_command('rebuild_shopping_lists', stdout=self.stdout)
+        bump_versions(RECIPE_LIST_VERSION_KEY, RECIPE_POPULARITY_VERSION_KEY,
+                      RECIPE_SEARCH_VERSION_KEY, USER_LIST_VERSION_KEY)
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано пользователей: {len(users)}, '
+            f'рецептов: {len(recipe_ids)}. Пароль: {PASSWORD}'))
+
+    def _bulk_create(self, model, objects):
+        objects = iter(objects)
+        while True:
+            batch = list(islice(objects, self.batch_size))
+            if not batch:
+                return
+            model.objects.bulk_create(batch, ignore_conflicts=True)
+
+    def _create_tags(self, count):
+        existing = Tag.objects.count()
+        self._bulk_create(Tag, (
+            Tag(name=f'Тег {number}', slug=f'tag-{number}',
+                color=f'#{self.rng.randrange(0x1000000):06x}')
+            for number in range(existing + 1, count + 1)
+        ))
+        return list(Tag.objects.values_list('id', flat=True))
+
+    def _create_users(self, prefix, count):
+        password = make_password(PASSWORD)
+        self._bulk_create(User, (
+            User(username=f'{prefix}_{number}',
+                 email=f'{prefix}_{number}@example.com',
+                 first_name='Пользователь', last_name=str(number),
+                 password=password)
+            for number in range(count)
+        ))
+        return list(User.objects.filter(
+            username__startswith=f'{prefix}_').values_list('id', flat=True))
+
+    def _create_recipes(self, users, tags, ingredients, count, exponent):
+        if not default_storage.exists(IMAGE_NAME):
+            buffer = BytesIO()
+            Image.new('RGB', (600, 400), '#49b64e').save(buffer, 'PNG')
+            default_storage.save(IMAGE_NAME, ContentFile(buffer.getvalue()))
+        authors = ZipfSampler(users, exponent, self.rng)
+        backend = get_backend()
+        now = timezone.now()
+        recipes = defaultdict(list)
+        created = 0
+        while created < count:
+            size = min(self.batch_size, count - created)
+            last_id = Recipe.objects.order_by('-id').values_list(
+                'id', flat=True).first() or 0
+            batch = []
+            for _ in range(size):
+                items = self.rng.sample(ingredients,
+                                        self.rng.randint(3, 10))
+                recipe = Recipe(
+                    author_id=self.rng.choices(
+                        authors.population, cum_weights=authors.weights)[0],
+                    name=(f'{self.rng.choice(ADJECTIVES)} рецепт: '
+                          f'{items[0][1]}')[:200],
+                    text='Понадобится: ' + ', '.join(
+                        name for _, name in items) + '.',
+                    cooking_time=self.rng.randint(5, 180),
+                    image=IMAGE_NAME)
+                recipe.items = items
+                backend.prepare(recipe)
+                batch.append(recipe)
+            Recipe.objects.bulk_create(batch)
+            ids = list(Recipe.objects.filter(id__gt=last_id).order_by(
+                'id').values_list('id', flat=True))
+            for recipe, recipe_id in zip(batch, ids):
+                recipe.pk = recipe_id
+                recipe.pub_date = recipe.updated_at = now - timedelta(
+                    minutes=count - created)
+                recipes[recipe.author_id].append(
+                    (recipe.pub_date, recipe_id))
+                created += 1
+            Recipe.objects.bulk_update(batch, ('pub_date', 'updated_at'))
+            self._bulk_create(IngredientInRecipe, (
+                IngredientInRecipe(recipe_id=recipe.id,
+                                   ingredient_id=ingredient_id,
+                                   amount=self.rng.randint(1, 100))
+                for recipe in batch for ingredient_id, _ in recipe.items
+            ))
+            self._bulk_create(Recipe.tags.through, (
+                Recipe.tags.through(recipe_id=recipe.id, tag_id=tag_id)
+                for recipe in batch
+                for tag_id in self.rng.sample(
+                    tags, min(len(tags), self.rng.randint(1, 3)))
+            ))
+        return recipes
+
+    def _create_relations(self, model, field, users, targets, average,
+                          exponent):
+        if not targets:
+            return {}
+        sampler = ZipfSampler(targets, exponent, self.rng)
+        related = defaultdict(list)
+        for user_id in users:
+            for target in sampler.sample(self.rng.randint(0, 2 * average)):
+                if model is not Follow or target != user_id:
+                    related[target].append(user_id)
+        self._bulk_create(model, (
+            model(user_id=user_id, **{field: target})
+            for target, user_ids in related.items() for user_id in user_ids
+        ))
+        return related
+
+    def _create_timelines(self, recipes, followers):
+        self._bulk_create(TimelineEntry, (
+            TimelineEntry(user_id=user_id, recipe_id=recipe_id,
+                          author_id=author_id, pub_date=pub_date)
+            for author_id, user_ids in followers.items()
+            if len(user_ids) <= settings.FEED_FANOUT_THRESHOLD
+            for pub_date, recipe_id in sorted(
+                recipes.get(author_id, ()),
+                reverse=True)[:settings.FEED_BACKFILL_SIZE]
+            for user_id in user_ids
+        ))
@@ -0,0 +1,46 @@
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from recipes.images import generate_derivatives
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Создаёт уменьшенные копии картинок рецептов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Количество процессов.')
+        parser.add_argument('--force', action='store_true',
+                            help='Пересоздать уже готовые копии.')
+
+    def handle(self, *args, **options):
+        recipes = defaultdict(list)
+        for recipe_id, name, derivatives in Recipe.objects.exclude(
+                image='').values_list('id', 'image', 'image_derivatives'):
+            if options['force'] or derivatives.get('source') != name:
+                recipes[name].append(recipe_id)
+        connections.close_all()
+        done = failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            futures = {pool.submit(generate_derivatives, name): name
+                       for name in recipes}
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    derivatives = future.result()
+                except Exception as error:
+                    failed += 1
+                    self.stderr.write(f'{name}: {error}')
+                    continue
+                for recipe in Recipe.objects.filter(id__in=recipes[name],
+                                                    image=name):
+                    recipe.image_derivatives = derivatives
+                    recipe.save(
+                        update_fields=('image_derivatives', 'updated_at'))
+                done += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано: {done}, ошибок: {failed}.'))
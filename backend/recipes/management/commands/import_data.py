@@ -1,28 +1,203 @@
 import csv
-import os
+import json
+from io import BytesIO
+from itertools import islice
+from pathlib import Path
 
-from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from PIL import Image
 
-from recipes.models import Ingredient
+from api.indexes import ingredient_index
+from recipes.counters import change_user_counters
+from recipes.models import Ingredient, IngredientInRecipe, Recipe, Tag
+from users.models import User
+
+DATA_DIR = Path(settings.BASE_DIR) / 'data'
+MAX_LENGTH = Ingredient._meta.get_field('name').max_length
+
+
+def read_csv(file):
+    for row in csv.reader(file):
+        if row == ['name', 'measurement_unit']:
+            continue
+        yield row
+
+
+def read_json(file, chunk_size=64 * 1024):
+    decoder = json.JSONDecoder()
+    buffer, position, started = '', 0, False
+    for chunk in iter(lambda: file.read(chunk_size), ''):
+        buffer = buffer[position:] + chunk
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if not started and buffer[position:position + 1] == '[':
+                started, position = True, position + 1
+                continue
+            if buffer[position:position + 1] in ('', ']'):
+                break
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                break
+            if isinstance(item, dict):
+                item = [item.get('name'), item.get('measurement_unit')]
+            yield item
+    if buffer[position:].strip() not in ('', ']'):
+        raise CommandError('Файл JSON обрезан или повреждён.')
+
+
+READERS = {'.csv': read_csv, '.json': read_json}
 
 
 class Command(BaseCommand):
-    file_path = os.path.join('data', 'ingredients.csv')
+    help = 'Загружает ингредиенты, а также теги и демо-рецепты.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'files', nargs='*', default=[DATA_DIR / 'ingredients.csv'],
+            help='Файлы с ингредиентами в формате CSV или JSON.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--tags', nargs='?', const=DATA_DIR / 'tags.json',
+            help='Загрузить теги из JSON-файла.')
+        parser.add_argument(
+            '--recipes', nargs='?', const=DATA_DIR / 'recipes.json',
+            help='Загрузить демо-рецепты из JSON-файла.')
 
     def handle(self, *args, **options):
-        try:
-            self._load_data()
-        except Exception as e:
-            self.stdout.write(self.style.ERROR(f'Ошибка при импорте {e}'))
-        else:
-            self.stdout.write(self.style.SUCCESS('Данные загружены успешно!'))
-
-    def _load_data(self):
-        with open(self.file_path, encoding='UTF-8') as f:
-            read_data = csv.reader(f)
-            next(read_data)
-            items = [
-                Ingredient(name=name, measurement_unit=unit)
-                for name, unit in read_data
-            ]
-            Ingredient.objects.bulk_create(items)
+        self.verbosity = options['verbosity']
+        inserted = skipped = failed = 0
+        for path in map(Path, options['files']):
+            reader = READERS.get(path.suffix.lower())
+            if reader is None:
+                raise CommandError(f'Неизвестный формат файла: {path}')
+            try:
+                with open(path, encoding='UTF-8') as file:
+                    counts = self._load_ingredients(
+                        reader(file), options['batch_size'])
+            except OSError as error:
+                raise CommandError(f'Не удалось прочитать {path}: {error}')
+            inserted += counts[0]
+            skipped += counts[1]
+            failed += counts[2]
+        if inserted:
+            ingredient_index.invalidate()
+        self.stdout.write(self.style.SUCCESS(
+            f'Ингредиенты: добавлено {inserted}, пропущено {skipped}, '
+            f'с ошибками {failed}.'))
+        if options['tags']:
+            self._load_tags(options['tags'])
+        if options['recipes']:
+            self._load_recipes(options['recipes'])
+
+    def _load_ingredients(self, rows, batch_size):
+        inserted = skipped = failed = 0
+        rows = enumerate(rows, start=1)
+        while True:
+            batch = {}
+            for number, row in islice(rows, batch_size):
+                key = self._clean_row(row)
+                if key is None:
+                    failed += 1
+                    if self.verbosity > 1:
+                        self.stderr.write(f'Строка {number}: {row!r}')
+                elif key in batch:
+                    skipped += 1
+                else:
+                    batch[key] = number
+            if not batch:
+                break
+            existing = set(Ingredient.objects.filter(
+                name__in={name for name, _ in batch}
+            ).values_list('name', 'measurement_unit'))
+            new = [Ingredient(name=name, measurement_unit=unit)
+                   for name, unit in batch if (name, unit) not in existing]
+            Ingredient.objects.bulk_create(new, ignore_conflicts=True)
+            inserted += len(new)
+            skipped += len(batch) - len(new)
+        return inserted, skipped, failed
+
+    def _clean_row(self, row):
+        if len(row) != 2 or not all(isinstance(item, str) for item in row):
+            return None
+        name, unit = (item.strip() for item in row)
+        if not name or not unit or max(len(name), len(unit)) > MAX_LENGTH:
+            return None
+        return name, unit
+
+    def _load_tags(self, path):
+        with open(path, encoding='UTF-8') as file:
+            tags = json.load(file)
+        existing = set(Tag.objects.values_list('slug', flat=True))
+        new = [Tag(name=tag['name'], color=tag['color'].lower(),
+                   slug=tag['slug'])
+               for tag in tags if tag['slug'] not in existing]
+        Tag.objects.bulk_create(new, ignore_conflicts=True)
+        self.stdout.write(self.style.SUCCESS(
+            f'Теги: добавлено {len(new)}, '
+            f'пропущено {len(tags) - len(new)}.'))
+
+    @transaction.atomic
+    def _load_recipes(self, path):
+        with open(path, encoding='UTF-8') as file:
+            recipes = json.load(file)
+        tags = {tag.slug: tag for tag in Tag.objects.all()}
+        ingredients = {
+            (item.name, item.measurement_unit): item.id
+            for item in Ingredient.objects.filter(name__in={
+                row['name']
+                for recipe in recipes for row in recipe['ingredients']
+            })
+        }
+        inserted = 0
+        for data in recipes:
+            author = self._get_author(data['author'])
+            if Recipe.objects.filter(author=author,
+                                     name=data['name']).exists():
+                continue
+            recipe = Recipe(author=author, name=data['name'],
+                            text=data['text'],
+                            cooking_time=data['cooking_time'])
+            recipe.image.save(f'demo_{author.id}.png',
+                              self._get_image(path, data), save=False)
+            recipe.save()
+            recipe.tags.add(*(tags[slug] for slug in data['tags']
+                              if slug in tags))
+            IngredientInRecipe.objects.bulk_create(
+                IngredientInRecipe(
+                    recipe=recipe,
+                    ingredient_id=ingredients[(row['name'],
+                                               row['measurement_unit'])],
+                    amount=row['amount'])
+                for row in data['ingredients']
+                if (row['name'], row['measurement_unit']) in ingredients
+            )
+            change_user_counters(author.id, recipes_count=1)
+            inserted += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Рецепты: добавлено {inserted}, '
+            f'пропущено {len(recipes) - inserted}.'))
+
+    def _get_author(self, data):
+        author, created = User.objects.get_or_create(
+            email=data['email'],
+            defaults={'username': data['username'],
+                      'first_name': data['first_name'],
+                      'last_name': data['last_name']})
+        if created:
+            author.set_unusable_password()
+            author.save(update_fields=('password',))
+        return author
+
+    def _get_image(self, path, data):
+        if data.get('image'):
+            return ContentFile((Path(path).parent / data['image'])
+                               .read_bytes())
+        buffer = BytesIO()
+        Image.new('RGB', (600, 400), '#e26c2d').save(buffer, 'PNG')
+        return ContentFile(buffer.getvalue())
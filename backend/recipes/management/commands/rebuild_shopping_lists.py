@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.models import ShoppingListItem
+from recipes.shopping_list import get_live_totals
+
+
+class Command(BaseCommand):
+    help = 'Сверяет и пересобирает сохранённые списки покупок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только проверить расхождения, ничего не изменяя.'
+        )
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        live = get_live_totals()
+        updated, deleted = [], []
+        for item in ShoppingListItem.objects.select_for_update().iterator():
+            total = live.pop((item.user_id, item.ingredient_id), None)
+            if total is None:
+                deleted.append(item.id)
+            elif total != item.total_amount:
+                item.total_amount = total
+                updated.append(item)
+        created = [
+            ShoppingListItem(user_id=user, ingredient_id=ingredient,
+                             total_amount=total)
+            for (user, ingredient), total in live.items()
+        ]
+        report = (f'Отсутствует: {len(created)}, '
+                  f'расходится: {len(updated)}, '
+                  f'лишних: {len(deleted)}')
+        if options['check']:
+            if created or updated or deleted:
+                raise CommandError(f'Найдены расхождения. {report}')
+            self.stdout.write(self.style.SUCCESS('Расхождений нет.'))
+            return
+        ShoppingListItem.objects.bulk_create(created, batch_size=1000)
+        ShoppingListItem.objects.bulk_update(updated, ('total_amount',),
+                                             batch_size=1000)
+        ShoppingListItem.objects.filter(id__in=deleted).delete()
+        self.stdout.write(self.style.SUCCESS(f'Исправлено. {report}'))
@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.counters import (
+    RECIPE_COUNTERS,
+    USER_COUNTERS,
+    get_live_recipe_counters,
+    get_live_user_counters
+)
+from recipes.models import Recipe
+from users.models import UserStats
+
+
+class Command(BaseCommand):
+    help = 'Сверяет и исправляет счётчики рецептов и пользователей.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только проверить расхождения, ничего не изменяя.'
+        )
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        recipes = self._collect(
+            get_live_recipe_counters().select_for_update().only(
+                'id', *RECIPE_COUNTERS),
+            RECIPE_COUNTERS)
+        created, users = [], []
+        for user in get_live_user_counters().select_related(
+                'stats').iterator():
+            live = {name: getattr(user, f'live_{name}')
+                    for name in USER_COUNTERS}
+            stats = getattr(user, 'stats', None)
+            if stats is None:
+                created.append(UserStats(user_id=user.id, **live))
+            elif any(getattr(stats, name) != value
+                     for name, value in live.items()):
+                for name, value in live.items():
+                    setattr(stats, name, value)
+                users.append(stats)
+        report = (f'рецептов с расхождениями: {len(recipes)}, '
+                  f'пользователей с расхождениями: {len(users)}, '
+                  f'пользователей без счётчиков: {len(created)}')
+        if options['check']:
+            if recipes or users or created:
+                raise CommandError(f'Найдены расхождения: {report}')
+            self.stdout.write(self.style.SUCCESS('Расхождений нет.'))
+            return
+        Recipe.objects.bulk_update(recipes, tuple(RECIPE_COUNTERS),
+                                   batch_size=1000)
+        UserStats.objects.bulk_update(users, tuple(USER_COUNTERS),
+                                      batch_size=1000)
+        UserStats.objects.bulk_create(created, batch_size=1000,
+                                      ignore_conflicts=True)
+        self.stdout.write(self.style.SUCCESS(f'Исправлено: {report}'))
+
+    def _collect(self, queryset, counters):
+        changed = []
+        for obj in queryset.iterator():
+            live = {name: getattr(obj, f'live_{name}') for name in counters}
+            if any(getattr(obj, name) != value
+                   for name, value in live.items()):
+                for name, value in live.items():
+                    setattr(obj, name, value)
+                changed.append(obj)
+        return changed
@@ -0,0 +1,38 @@
+# Generated by Django 3.2 on 2026-10-17 05:55
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+from recipes.search import CREATE_SEARCH_SQL, DROP_SEARCH_SQL, build_document
+
+
+def create_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(CREATE_SEARCH_SQL)
+        return
+    Recipe = apps.get_model('recipes', 'Recipe')
+    recipes = list(Recipe.objects.only('name', 'text'))
+    for recipe in recipes:
+        recipe.search_vector = build_document(recipe.name, recipe.text)
+    Recipe.objects.bulk_update(recipes, ['search_vector'], batch_size=500)
+
+
+def drop_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_SEARCH_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_recipe_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый индекс'),
+        ),
+        migrations.RunPython(create_search_vector, drop_search_vector),
+    ]
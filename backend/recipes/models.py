@@ -1,6 +1,7 @@
 import re
 
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import (
     MaxValueValidator,
     MinValueValidator,
@@ -68,6 +69,12 @@ class Recipe(models.Model):
     )
     name = models.CharField('Название', max_length=200)
     image = models.ImageField('Картинка', upload_to='recipes/images/')
+    image_derivatives = models.JSONField(
+        'Уменьшенные копии картинки',
+        default=dict,
+        blank=True,
+        editable=False
+    )
     text = models.TextField('Описание')
     ingredients = models.ManyToManyField(
         Ingredient,
@@ -86,11 +93,35 @@ class Recipe(models.Model):
                 message='Максимальное время приготовления 24 чаcа.')
         ])
     pub_date = models.DateTimeField('Дата публикации', auto_now_add=True)
+    updated_at = models.DateTimeField('Дата изменения', auto_now=True)
+    search_vector = SearchVectorField(
+        'Поисковый индекс',
+        null=True,
+        editable=False
+    )
+    favorites_count = models.PositiveIntegerField(
+        'В избранных',
+        default=0,
+        editable=False
+    )
+    in_carts_count = models.PositiveIntegerField(
+        'В списках покупок',
+        default=0,
+        editable=False
+    )
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            models.Index(
+                fields=('-favorites_count', '-pub_date', '-id'),
+                name='recipe_popularity_idx'),
+            models.Index(
+                fields=('-pub_date', '-id'),
+                name='recipe_pub_date_idx')
+        ]
 
     def __str__(self):
         return self.name
@@ -183,3 +214,67 @@ class Favorite(models.Model):
 
     def __str__(self):
         return f'{self.user} добавил {self.recipe.name} в избранное'
+
+
+class ShoppingListItem(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list',
+        verbose_name='Пользователь',
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items',
+        verbose_name='Ингредиент',
+    )
+    total_amount = models.PositiveIntegerField('Общее количество')
+
+    class Meta:
+        verbose_name = 'Позиция списка покупок'
+        verbose_name_plural = 'Позиции списка покупок'
+        constraints = [models.UniqueConstraint(
+            fields=('user', 'ingredient'),
+            name='shopping_list_unique'
+        )]
+
+    def __str__(self):
+        return f'{self.user}: {self.ingredient} - {self.total_amount}'
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Подписчик',
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Рецепт',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор',
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = [models.UniqueConstraint(
+            fields=('user', 'recipe'),
+            name='timeline_unique'
+        )]
+        indexes = [models.Index(
+            fields=('user', '-pub_date', '-recipe'),
+            name='timeline_user_pub_date_idx'
+        )]
+
+    def __str__(self):
+        return f'{self.user}: {self.recipe}'
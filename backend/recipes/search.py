@@ -0,0 +1,91 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.db.models.functions import StrIndex
+
+SEARCH_CONFIG = 'russian'
+MAX_TERMS = 10
+TERM_RE = re.compile(r'\w+')
+ENDING_RE = re.compile(r'(?<=\w{3})[аеёиийоуыьэюя]{1,2}$')
+
+CREATE_SEARCH_SQL = f'''
+CREATE OR REPLACE FUNCTION recipes_recipe_search_vector_update()
+RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(NEW.name, '')), 'A')
+        || setweight(
+            to_tsvector('{SEARCH_CONFIG}', coalesce(NEW.text, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER recipes_recipe_search_vector_trigger
+BEFORE INSERT OR UPDATE OF name, text ON recipes_recipe
+FOR EACH ROW EXECUTE PROCEDURE recipes_recipe_search_vector_update();
+
+CREATE INDEX recipes_recipe_search_vector_gin
+ON recipes_recipe USING gin (search_vector);
+
+UPDATE recipes_recipe SET name = name;
+'''
+
+DROP_SEARCH_SQL = '''
+DROP INDEX IF EXISTS recipes_recipe_search_vector_gin;
+DROP TRIGGER IF EXISTS recipes_recipe_search_vector_trigger ON recipes_recipe;
+DROP FUNCTION IF EXISTS recipes_recipe_search_vector_update();
+'''
+
+
+def get_terms(value):
+    terms = TERM_RE.findall(value.casefold().replace('ё', 'е'))
+    return [ENDING_RE.sub('', term) for term in terms[:MAX_TERMS]]
+
+
+def build_document(name, text):
+    return '\n'.join((' '.join(get_terms(name or '')),
+                      ' '.join(get_terms(text or ''))))
+
+
+class PostgresSearchBackend:
+    def prepare(self, recipe):
+        pass
+
+    def search(self, queryset, value):
+        query = SearchQuery(value, config=SEARCH_CONFIG,
+                            search_type='websearch')
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query)
+        ).order_by('-search_rank', '-pub_date')
+
+
+class SimpleSearchBackend:
+    def prepare(self, recipe):
+        recipe.search_vector = build_document(recipe.name, recipe.text)
+
+    def search(self, queryset, value):
+        terms = get_terms(value)
+        if not terms:
+            return queryset.none()
+        condition = Q()
+        rank = Value(0)
+        for term in terms:
+            condition &= Q(search_vector__contains=term)
+            rank += Case(
+                When(title_end__gt=StrIndex('search_vector', Value(term)),
+                     then=Value(2)),
+                default=Value(1),
+                output_field=IntegerField())
+        return queryset.annotate(
+            title_end=StrIndex('search_vector', Value('\n'))
+        ).filter(condition).annotate(
+            search_rank=rank
+        ).order_by('-search_rank', '-pub_date')
+
+
+def get_backend():
+    if connection.vendor == 'postgresql':
+        return PostgresSearchBackend()
+    return SimpleSearchBackend()
@@ -0,0 +1,100 @@
+from collections import Counter
+
+from django.db.models import Sum
+
+from recipes.counters import lock_users
+from recipes.models import IngredientInRecipe, ShoppingCart, ShoppingListItem
+
+
+def get_recipe_amounts(recipe_id):
+    return Counter(dict(IngredientInRecipe.objects.filter(
+        recipe_id=recipe_id).values_list('ingredient_id', 'amount')))
+
+
+def get_recipes_amounts(recipe_ids):
+    return Counter(dict(IngredientInRecipe.objects.filter(
+        recipe_id__in=recipe_ids).order_by().values(
+        'ingredient_id').annotate(total=Sum('amount')).values_list(
+        'ingredient_id', 'total')))
+
+
+def get_live_totals():
+    rows = ShoppingCart.objects.filter(
+        recipe__recipe_ingredient__isnull=False
+    ).values_list(
+        'user_id', 'recipe__recipe_ingredient__ingredient_id'
+    ).annotate(total=Sum('recipe__recipe_ingredient__amount'))
+    return {(user, ingredient): total
+            for user, ingredient, total in rows.iterator()}
+
+
+def apply_amounts(user_ids, amounts):
+    amounts = {ingredient: amount
+               for ingredient, amount in amounts.items() if amount}
+    if not user_ids or not amounts:
+        return
+    lock_users(user_ids)
+    items = {
+        (item.user_id, item.ingredient_id): item
+        for item in ShoppingListItem.objects.select_for_update().filter(
+            user_id__in=user_ids, ingredient_id__in=amounts)
+    }
+    created, updated, deleted = [], [], []
+    for user in user_ids:
+        for ingredient, amount in amounts.items():
+            item = items.get((user, ingredient))
+            if item is None:
+                if amount > 0:
+                    created.append(ShoppingListItem(
+                        user_id=user, ingredient_id=ingredient,
+                        total_amount=amount))
+            elif item.total_amount + amount > 0:
+                item.total_amount += amount
+                updated.append(item)
+            else:
+                deleted.append(item.id)
+    ShoppingListItem.objects.bulk_create(created)
+    ShoppingListItem.objects.bulk_update(updated, ('total_amount',))
+    if deleted:
+        ShoppingListItem.objects.filter(id__in=deleted).delete()
+
+
+def add_recipe(user_id, recipe_id):
+    apply_amounts([user_id], get_recipe_amounts(recipe_id))
+
+
+def remove_recipe(recipe_id, user_id=None):
+    carts = ShoppingCart.objects.filter(recipe_id=recipe_id)
+    if user_id is not None:
+        carts = carts.filter(user_id=user_id)
+    amounts = get_recipe_amounts(recipe_id)
+    apply_amounts(list(carts.values_list('user_id', flat=True)),
+                  {ingredient: -amount
+                   for ingredient, amount in amounts.items()})
+
+
+def add_recipes(user_id, recipe_ids):
+    if recipe_ids:
+        apply_amounts([user_id], get_recipes_amounts(recipe_ids))
+
+
+def remove_recipes(user_id, recipe_ids):
+    if recipe_ids:
+        apply_amounts([user_id], {
+            ingredient: -amount
+            for ingredient, amount in get_recipes_amounts(recipe_ids).items()
+        })
+
+
+def clear(user_id):
+    lock_users([user_id])
+    ShoppingListItem.objects.filter(user_id=user_id).delete()
+
+
+def change_recipe(recipe_id, old_amounts, new_amounts):
+    amounts = Counter(new_amounts)
+    amounts.subtract(old_amounts)
+    if not any(amounts.values()):
+        return
+    apply_amounts(list(ShoppingCart.objects.filter(
+        recipe_id=recipe_id).values_list('user_id', flat=True)), amounts)
@@ -0,0 +1,27 @@
+from django.db import transaction
+from django.db.models.signals import post_save, pre_save
+from django.dispatch import receiver
+
+from recipes.timeline import fan_out
+from recipes.images import enqueue_recipe
+from recipes.models import Recipe
+from recipes.search import get_backend
+
+
+@receiver(post_save, sender=Recipe)
+def create_image_derivatives(sender, instance, **kwargs):
+    if (instance.image
+            and instance.image_derivatives.get('source')
+            != instance.image.name):
+        transaction.on_commit(lambda: enqueue_recipe(instance.id))
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_recipe(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: fan_out(instance.id))
+
+
+@receiver(pre_save, sender=Recipe)
+def prepare_search_vector(sender, instance, **kwargs):
+    get_backend().prepare(instance)
@@ -0,0 +1,239 @@
+import json
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from uuid import uuid4
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from scipy import sparse
+
+from recipes.models import IngredientInRecipe, Recipe
+
+CURRENT_LINK = 'current'
+ARRAYS = ('ids', 'neighbours', 'scores')
+CHUNK_SIZE = 512
+REFRESH_LOCK_KEY = 'similarity_refresh_lock'
+REFRESH_LOCK_TIMEOUT = 600
+
+
+def get_features(ids, pairs, weighted):
+    pairs = np.array(pairs, dtype=np.int64).reshape(-1, 2)
+    pairs = pairs[np.isin(pairs[:, 0], ids)]
+    features, columns = np.unique(pairs[:, 1], return_inverse=True)
+    matrix = sparse.csr_matrix(
+        (np.ones(len(pairs), dtype=np.float32),
+         (np.searchsorted(ids, pairs[:, 0]), columns)),
+        shape=(len(ids), len(features)))
+    if weighted:
+        counts = np.bincount(columns, minlength=len(features))
+        matrix = matrix.multiply(
+            np.log((1 + len(ids)) / (1 + counts)) + 1).tocsr()
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)))
+    return sparse.diags(
+        np.divide(1, norms, out=np.zeros_like(norms), where=norms > 0).ravel()
+    ).dot(matrix).astype(np.float32).tocsr()
+
+
+def select_top(scores, candidates, count):
+    if scores.shape[1] > count:
+        part = np.argpartition(-scores, count - 1, axis=1)[:, :count]
+        scores = np.take_along_axis(scores, part, axis=1)
+        candidates = np.take_along_axis(candidates, part, axis=1)
+    order = np.argsort(-scores, axis=1, kind='stable')
+    scores = np.take_along_axis(scores, order, axis=1)
+    candidates = np.where(
+        scores > 0, np.take_along_axis(candidates, order, axis=1), -1)
+    padding = ((0, 0), (0, count - scores.shape[1]))
+    return (np.pad(candidates, padding, constant_values=-1).astype(np.int32),
+            np.pad(np.maximum(scores, 0), padding).astype(np.float32))
+
+
+class SimilarityModel:
+    def __init__(self):
+        self.built_at = timezone.now()
+        self.count = settings.SIMILARITY_NEIGHBOURS
+        self.tag_weight = settings.SIMILARITY_TAG_WEIGHT
+        self.ids = np.array(Recipe.objects.order_by('id').values_list(
+            'id', flat=True), dtype=np.int64)
+        self.ingredients = get_features(
+            self.ids, IngredientInRecipe.objects.values_list(
+                'recipe_id', 'ingredient_id'), weighted=True)
+        self.tags = get_features(
+            self.ids, Recipe.tags.through.objects.values_list(
+                'recipe_id', 'tag_id'), weighted=False)
+
+    def get_scores(self, rows):
+        scores = ((1 - self.tag_weight)
+                  * self.ingredients[rows].dot(self.ingredients.T).toarray()
+                  + self.tag_weight
+                  * self.tags[rows].dot(self.tags.T).toarray())
+        scores[np.arange(len(rows)), rows] = 0
+        return scores.astype(np.float32)
+
+    def get_chunks(self, rows):
+        for start in range(0, len(rows), CHUNK_SIZE):
+            chunk = rows[start:start + CHUNK_SIZE]
+            yield chunk, self.get_scores(chunk)
+
+    def build(self):
+        neighbours = np.full((len(self.ids), self.count), -1, np.int32)
+        scores = np.zeros((len(self.ids), self.count), np.float32)
+        self.update_rows(np.arange(len(self.ids)), neighbours, scores)
+        return neighbours, scores
+
+    def update_rows(self, rows, neighbours, scores):
+        candidates = np.arange(len(self.ids))
+        for chunk, chunk_scores in self.get_chunks(rows):
+            neighbours[chunk], scores[chunk] = select_top(
+                chunk_scores,
+                np.broadcast_to(candidates, chunk_scores.shape),
+                self.count)
+
+    def refresh(self, index, changed_ids):
+        positions = np.searchsorted(self.ids, index['ids'])
+        positions = np.minimum(positions, max(len(self.ids) - 1, 0))
+        kept = (self.ids[positions] == index['ids']
+                if len(self.ids) else np.zeros(len(index['ids']), bool))
+        mapping = np.where(kept, positions, -1)
+
+        changed = np.ones(len(self.ids), bool)
+        changed[mapping[kept]] = False
+        changed[np.isin(self.ids, changed_ids)] = True
+        neighbours = np.full((len(self.ids), self.count), -1, np.int32)
+        scores = np.zeros((len(self.ids), self.count), np.float32)
+        old = np.asarray(index['neighbours'])
+        remapped = np.where(old >= 0, mapping[np.maximum(old, 0)], -1)
+        neighbours[mapping[kept]] = remapped[kept]
+        scores[mapping[kept]] = np.where(remapped >= 0,
+                                         index['scores'], 0)[kept]
+
+        lost = (old >= 0) & (remapped < 0)
+        recompute = changed.copy()
+        recompute[mapping[kept & lost.any(axis=1)]] = True
+        scores[np.isin(neighbours, np.flatnonzero(changed))] = 0
+
+        rows = np.flatnonzero(recompute)
+        if len(rows) > len(self.ids) * settings.SIMILARITY_REFRESH_RATIO:
+            return None
+        merged = np.flatnonzero(~recompute)
+        for chunk, chunk_scores in self.get_chunks(np.flatnonzero(changed)):
+            neighbours[merged], scores[merged] = select_top(
+                np.concatenate((scores[merged], chunk_scores.T[merged]),
+                               axis=1),
+                np.concatenate((neighbours[merged], np.broadcast_to(
+                    chunk, (len(merged), len(chunk)))), axis=1),
+                self.count)
+        self.update_rows(rows, neighbours, scores)
+        return neighbours, scores, len(rows)
+
+
+class SimilarityIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._target = None
+        self._arrays = None
+
+    @property
+    def path(self):
+        return Path(settings.SIMILARITY_INDEX_DIR)
+
+    def get_similar(self, recipe_id, limit):
+        arrays = self.load()
+        if arrays is None:
+            return []
+        ids, neighbours = arrays['ids'], arrays['neighbours']
+        position = np.searchsorted(ids, recipe_id)
+        if position >= len(ids) or ids[position] != recipe_id:
+            return []
+        row = neighbours[position]
+        return ids[row[row >= 0][:limit]].tolist()
+
+    def load(self):
+        target = self._read_link()
+        if target is None:
+            return None
+        with self._lock:
+            if target != self._target:
+                directory = self.path / target
+                self._arrays = {
+                    name: np.load(directory / f'{name}.npy', mmap_mode='r')
+                    for name in ARRAYS
+                }
+                self._arrays['meta'] = json.loads(
+                    (directory / 'meta.json').read_text())
+                self._target = target
+            return self._arrays
+
+    def get_changed_ids(self, meta):
+        built_at = parse_datetime(meta['built_at'])
+        return list(Recipe.objects.filter(
+            updated_at__gte=built_at).values_list('id', flat=True))
+
+    def refresh(self, full=False):
+        index = None if full else self.load()
+        if (index is not None
+                and index['meta']['neighbours']
+                == settings.SIMILARITY_NEIGHBOURS
+                and index['meta']['tag_weight']
+                == settings.SIMILARITY_TAG_WEIGHT):
+            changed_ids = self.get_changed_ids(index['meta'])
+            if (not changed_ids
+                    and Recipe.objects.count() == len(index['ids'])):
+                return 0, False
+            model = SimilarityModel()
+            result = model.refresh(index, changed_ids)
+            if result is not None:
+                neighbours, scores, updated = result
+                self.save(model, neighbours, scores)
+                return updated, False
+        else:
+            model = SimilarityModel()
+        neighbours, scores = model.build()
+        self.save(model, neighbours, scores)
+        return len(model.ids), True
+
+    @contextmanager
+    def refreshing(self):
+        acquired = cache.add(REFRESH_LOCK_KEY, True, REFRESH_LOCK_TIMEOUT)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                cache.delete(REFRESH_LOCK_KEY)
+
+    def save(self, model, neighbours, scores):
+        self.path.mkdir(parents=True, exist_ok=True)
+        target = f'{model.built_at:%Y%m%d%H%M%S}-{uuid4().hex[:8]}'
+        directory = self.path / target
+        directory.mkdir()
+        for name, array in zip(ARRAYS, (model.ids, neighbours, scores)):
+            np.save(directory / f'{name}.npy', array)
+        (directory / 'meta.json').write_text(json.dumps({
+            'built_at': model.built_at.isoformat(),
+            'neighbours': model.count,
+            'tag_weight': model.tag_weight,
+            'recipes': len(model.ids),
+        }))
+        link = self.path / f'{CURRENT_LINK}.{target}'
+        os.symlink(target, link)
+        previous = self._read_link()
+        os.replace(link, self.path / CURRENT_LINK)
+        for stale in self.path.iterdir():
+            if stale.is_dir() and not stale.is_symlink() and (
+                    stale.name not in (target, previous)):
+                shutil.rmtree(stale, ignore_errors=True)
+
+    def _read_link(self):
+        try:
+            return os.readlink(self.path / CURRENT_LINK)
+        except OSError:
+            return None
+
+
+similarity_index = SimilarityIndex()
@@ -0,0 +1,93 @@
+from collections import namedtuple
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import Q
+
+from recipes.models import Recipe, TimelineEntry
+from users.models import Follow, UserStats
+
+FeedItem = namedtuple('FeedItem', ('pub_date', 'id'))
+
+
+def is_fanned_out(author_id):
+    return not UserStats.objects.filter(
+        user_id=author_id,
+        followers_count__gt=settings.FEED_FANOUT_THRESHOLD
+    ).exists()
+
+
+def fan_out(recipe_id):
+    recipe = Recipe.objects.filter(id=recipe_id).values(
+        'author_id', 'pub_date').first()
+    if recipe is None or not is_fanned_out(recipe['author_id']):
+        return
+    followers = Follow.objects.filter(
+        author_id=recipe['author_id']).values_list('user_id', flat=True)
+    followers = followers.iterator(chunk_size=settings.FEED_BATCH_SIZE)
+    while True:
+        batch = list(islice(followers, settings.FEED_BATCH_SIZE))
+        if not batch:
+            break
+        TimelineEntry.objects.bulk_create(
+            (TimelineEntry(user_id=user_id, recipe_id=recipe_id, **recipe)
+             for user_id in batch),
+            ignore_conflicts=True)
+
+
+def backfill(user_id, author_id):
+    if not is_fanned_out(author_id):
+        return
+    recipes = Recipe.objects.filter(author_id=author_id).order_by(
+        '-pub_date', '-id').values_list('id', 'pub_date')
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, recipe_id=recipe_id,
+                       author_id=author_id, pub_date=pub_date)
+         for recipe_id, pub_date in recipes[:settings.FEED_BACKFILL_SIZE]),
+        ignore_conflicts=True)
+
+
+def get_position_filter(id_field, position, reverse):
+    pub_date, item_id = position
+    lookup = 'gt' if reverse else 'lt'
+    return Q(**{f'pub_date__{lookup}': pub_date}) | Q(
+        pub_date=pub_date, **{f'{id_field}__{lookup}': item_id})
+
+
+def get_page(user_id, position, reverse, limit):
+    follows = dict(Follow.objects.filter(user_id=user_id).values_list(
+        'author_id', 'author__stats__followers_count'))
+    merged = {
+        author for author, followers in follows.items()
+        if (followers or 0) > settings.FEED_FANOUT_THRESHOLD
+    }
+    prefix = '' if reverse else '-'
+
+    entries = TimelineEntry.objects.filter(user_id=user_id).order_by(
+        f'{prefix}pub_date', f'{prefix}recipe_id')
+    if position is not None:
+        entries = entries.filter(
+            get_position_filter('recipe_id', position, reverse))
+    items, stale = [], []
+    for entry_id, pub_date, recipe_id, author_id in entries.values_list(
+            'id', 'pub_date', 'recipe_id', 'author_id').iterator(
+            chunk_size=limit * 2):
+        if author_id not in follows:
+            stale.append(entry_id)
+        elif author_id not in merged:
+            items.append(FeedItem(pub_date, recipe_id))
+            if len(items) == limit:
+                break
+    if stale:
+        TimelineEntry.objects.filter(id__in=stale).delete()
+
+    if merged:
+        recipes = Recipe.objects.filter(author_id__in=merged).order_by(
+            f'{prefix}pub_date', f'{prefix}id')
+        if position is not None:
+            recipes = recipes.filter(
+                get_position_filter('id', position, reverse))
+        items += map(FeedItem._make,
+                     recipes.values_list('pub_date', 'id')[:limit])
+        items = sorted(set(items), reverse=not reverse)
+    return items[:limit]
@@ -0,0 +1,182 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client
+
+from core.paginators import EstimatedCountPaginator
+from recipes import shopping_list
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    ShoppingCart,
+    ShoppingListItem
+)
+from tests.base import DatasetTestCase
+from users.models import Follow, User
+
+
+class AdminChangelistTest(DatasetTestCase):
+    def test_changelists_use_estimated_count(self):
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+        self.client.force_login(admin)
+        for path in ('/admin/auth/user/', '/admin/users/follow/',
+                     '/admin/recipes/recipe/', '/admin/recipes/ingredient/',
+                     '/admin/recipes/shoppingcart/'):
+            with self.subTest(path=path):
+                response = self.client.get(path)
+                self.assertEqual(response.status_code, 200)
+                self.assertIsInstance(response.context['cl'].paginator,
+                                      EstimatedCountPaginator)
+
+
+class AdminShoppingListTest(DatasetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = Client()
+        self.admin.force_login(User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'))
+
+    def assertShoppingListsMatch(self):
+        self.assertEqual(
+            {(item.user_id, item.ingredient_id): item.total_amount
+             for item in ShoppingListItem.objects.all()},
+            shopping_list.get_live_totals())
+
+    def delete_selected(self, path, ids):
+        return self.admin.post(path, {
+            'action': 'delete_selected', '_selected_action': ids,
+            'post': 'yes'})
+
+    def test_shopping_cart_admin_keeps_lists(self):
+        cart = ShoppingCart.objects.order_by('id').first()
+        recipe = Recipe.objects.exclude(
+            shopping_carts__user=cart.user).order_by('id').first()
+        other = User.objects.exclude(id=cart.user_id).exclude(
+            shopping_carts__recipe=cart.recipe).order_by('id').first()
+        for path, data in (
+                ('/admin/recipes/shoppingcart/add/',
+                 {'user': cart.user_id, 'recipe': recipe.id}),
+                (f'/admin/recipes/shoppingcart/{cart.id}/change/',
+                 {'user': other.id, 'recipe': cart.recipe_id}),
+                (f'/admin/recipes/shoppingcart/{cart.id}/delete/',
+                 {'post': 'yes'})):
+            with self.subTest(path=path):
+                self.assertEqual(self.admin.post(path, data).status_code,
+                                 302)
+                self.assertShoppingListsMatch()
+        self.delete_selected('/admin/recipes/shoppingcart/', list(
+            ShoppingCart.objects.values_list('id', flat=True)[:5]))
+        self.assertShoppingListsMatch()
+
+    def test_recipe_admin_keeps_lists(self):
+        recipe = Recipe.objects.filter(
+            shopping_carts__isnull=False).order_by('id').first()
+        rows = list(recipe.recipe_ingredient.order_by('id'))
+        ingredient = Ingredient.objects.exclude(
+            recipe_ingredient__recipe=recipe).order_by('id').first()
+        data = {
+            'author': recipe.author_id, 'name': recipe.name,
+            'text': recipe.text, 'cooking_time': recipe.cooking_time,
+            'tags': list(recipe.tags.values_list('id', flat=True)),
+            'recipe_ingredient-TOTAL_FORMS': len(rows) + 1,
+            'recipe_ingredient-INITIAL_FORMS': len(rows),
+            'recipe_ingredient-MIN_NUM_FORMS': 1,
+            'recipe_ingredient-MAX_NUM_FORMS': 1000,
+            f'recipe_ingredient-{len(rows)}-recipe': recipe.id,
+            f'recipe_ingredient-{len(rows)}-ingredient': ingredient.id,
+            f'recipe_ingredient-{len(rows)}-amount': 7,
+        }
+        for number, row in enumerate(rows):
+            prefix = f'recipe_ingredient-{number}-'
+            data.update({
+                f'{prefix}id': row.id, f'{prefix}recipe': recipe.id,
+                f'{prefix}ingredient': row.ingredient_id,
+                f'{prefix}amount': row.amount + 1,
+            })
+        data['recipe_ingredient-0-DELETE'] = 'on'
+        response = self.admin.post(
+            f'/admin/recipes/recipe/{recipe.id}/change/', data)
+        self.assertEqual(response.status_code, 302)
+        self.assertShoppingListsMatch()
+        self.delete_selected('/admin/recipes/recipe/', [recipe.id])
+        self.assertFalse(Recipe.objects.filter(id=recipe.id).exists())
+        self.assertShoppingListsMatch()
+
+    def test_shopping_list_items_are_read_only(self):
+        item = ShoppingListItem.objects.order_by('id').first()
+        path = f'/admin/recipes/shoppinglistitem/{item.id}/change/'
+        self.assertEqual(self.admin.get(path).status_code, 200)
+        for path in (path, '/admin/recipes/shoppinglistitem/add/',
+                     f'/admin/recipes/shoppinglistitem/{item.id}/delete/'):
+            with self.subTest(path=path):
+                self.assertEqual(self.admin.post(path, {}).status_code, 403)
+
+    def test_user_admin_keeps_lists(self):
+        user = User.objects.exclude(id=self.user.id).filter(
+            recipes__shopping_carts__isnull=False).order_by('id').first()
+        response = self.admin.post(f'/admin/auth/user/{user.id}/delete/',
+                                   {'post': 'yes'})
+        self.assertEqual(response.status_code, 302)
+        self.assertShoppingListsMatch()
+        self.delete_selected('/admin/auth/user/', list(
+            User.objects.filter(is_superuser=False).exclude(
+                id=self.user.id).values_list('id', flat=True)[:3]))
+        self.assertShoppingListsMatch()
+
+
+class AdminCountersTest(DatasetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = Client()
+        self.admin.force_login(User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'))
+
+    def assertCountersMatch(self):
+        call_command('reconcile_counters', check=True, stdout=StringIO())
+
+    def post(self, path, data):
+        self.assertEqual(self.admin.post(path, data).status_code, 302)
+        self.assertCountersMatch()
+
+    def delete_selected(self, path, ids):
+        self.post(path, {'action': 'delete_selected',
+                         '_selected_action': ids, 'post': 'yes'})
+
+    def test_relation_admins_keep_counters(self):
+        self.assertCountersMatch()
+        for model, field, path in (
+                (Favorite, 'recipe', '/admin/recipes/favorite/'),
+                (ShoppingCart, 'recipe', '/admin/recipes/shoppingcart/'),
+                (Follow, 'author', '/admin/users/follow/')):
+            with self.subTest(path=path):
+                target = Recipe if field == 'recipe' else User
+                relation = model.objects.order_by('id').first()
+                taken = model.objects.filter(
+                    user=relation.user).values_list(field, flat=True)
+                free = target.objects.exclude(id__in=taken).exclude(
+                    id=relation.user_id).order_by('id')
+                self.post(f'{path}add/', {'user': relation.user_id,
+                                          field: free[0].id})
+                self.post(f'{path}{relation.id}/change/',
+                          {'user': relation.user_id, field: free[1].id})
+                self.post(f'{path}{relation.id}/delete/', {'post': 'yes'})
+                self.delete_selected(path, list(
+                    model.objects.values_list('id', flat=True)[:5]))
+
+    def test_recipe_admin_keeps_counters(self):
+        self.delete_selected('/admin/recipes/recipe/', list(
+            Recipe.objects.values_list('id', flat=True)[:3]))
+        recipe = Recipe.objects.order_by('id').first()
+        self.post(f'/admin/recipes/recipe/{recipe.id}/delete/',
+                  {'post': 'yes'})
+
+    def test_user_admin_keeps_counters(self):
+        user = User.objects.exclude(id=self.user.id).filter(
+            favorites__isnull=False, shopping_carts__isnull=False,
+            follower__isnull=False).order_by('id').first()
+        self.post(f'/admin/auth/user/{user.id}/delete/', {'post': 'yes'})
+        self.delete_selected('/admin/auth/user/', list(
+            User.objects.filter(is_superuser=False).exclude(
+                id=self.user.id).values_list('id', flat=True)[:3]))
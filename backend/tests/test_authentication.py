@@ -0,0 +1,21 @@
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.exceptions import AuthenticationFailed
+
+from api.authentication import CachedTokenAuthentication, token_cache_key
+from tests.base import DatasetTestCase
+
+
+class CachedTokenTest(DatasetTestCase):
+    def test_deleted_token_is_evicted_inside_transaction(self):
+        authentication = CachedTokenAuthentication()
+        token = self.token.key
+        authentication.authenticate_credentials(token)
+        key = token_cache_key(token)
+        self.assertIsNotNone(cache.get(key))
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.token.delete()
+        self.assertIsNone(cache.get(key))
+        with self.assertRaises(AuthenticationFailed):
+            authentication.authenticate_credentials(token)
@@ -0,0 +1,44 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+
+from api import batch
+from recipes.counters import change_recipe_counters
+from recipes.models import Favorite, Recipe
+from tests.base import DatasetTestCase
+
+
+class BatchCountersTest(DatasetTestCase):
+    def assertCountersMatch(self):
+        call_command('reconcile_counters', check=True, stdout=StringIO())
+
+    def get_free_ids(self, count):
+        return list(Recipe.objects.exclude(favorites__user=self.user).order_by(
+            'id').values_list('id', flat=True)[:count])
+
+    def test_retried_batch_counts_once(self):
+        ids = self.get_free_ids(3)
+        for _ in range(2):
+            response = self.client.post('/api/recipes/favorite/batch/',
+                                        {'ids': ids}, format='json')
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [item['status'] for item in response.data], ['exists'] * 3)
+        self.assertCountersMatch()
+
+    def test_rows_inserted_while_waiting_for_lock_are_not_counted(self):
+        ids = self.get_free_ids(3)
+        lock_users = batch.lock_users
+
+        def insert_concurrently(user_ids):
+            Favorite.objects.create(user=self.user, recipe_id=ids[0])
+            change_recipe_counters(ids[0], favorites_count=1)
+            lock_users(user_ids)
+
+        with mock.patch.object(batch, 'lock_users', insert_concurrently):
+            response = self.client.post('/api/recipes/favorite/batch/',
+                                        {'ids': ids}, format='json')
+        self.assertEqual([item['status'] for item in response.data],
+                         ['exists', 'created', 'created'])
+        self.assertCountersMatch()
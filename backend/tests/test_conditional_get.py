@@ -0,0 +1,30 @@
+from recipes.models import Recipe
+from tests.base import DatasetTestCase
+
+
+class RecipeListValidatorsTest(DatasetTestCase):
+    def test_cached_list_issues_no_queries(self):
+        first = self.anonymous.get('/api/recipes/')
+        with self.assertNumQueries(0):
+            response = self.anonymous.get('/api/recipes/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], first['ETag'])
+        self.assertEqual(response['Last-Modified'], first['Last-Modified'])
+
+    def test_not_modified_without_queries(self):
+        etag = self.anonymous.get('/api/recipes/')['ETag']
+        with self.assertNumQueries(0):
+            response = self.anonymous.get('/api/recipes/',
+                                          HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_recipe_update_changes_validators(self):
+        first = self.anonymous.get('/api/recipes/')
+        recipe = Recipe.objects.order_by('-pub_date', '-id').last()
+        recipe.name = 'Новое название'
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.save()
+        response = self.anonymous.get('/api/recipes/',
+                                      HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], first['ETag'])
@@ -0,0 +1,12 @@
+from recipes.models import IngredientInRecipe, Recipe
+from tests.base import DatasetTestCase
+
+
+class GenerateDatasetTest(DatasetTestCase):
+    def test_generated_rows_pass_model_validation(self):
+        for model, fields in ((Recipe, ('cooking_time',)),
+                              (IngredientInRecipe, ('amount',))):
+            excluded = [field.name for field in model._meta.fields
+                        if field.name not in fields]
+            for obj in model.objects.all():
+                obj.clean_fields(exclude=excluded)
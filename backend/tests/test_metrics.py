@@ -0,0 +1,18 @@
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from api.metrics import metrics_view
+
+
+class MetricsViewTest(SimpleTestCase):
+    def test_metrics_are_disabled_by_default(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_token_is_required(self):
+        factory = RequestFactory()
+        for headers, status in (({}, 403),
+                                ({'HTTP_AUTHORIZATION': 'Bearer wrong'}, 403),
+                                ({'HTTP_AUTHORIZATION': 'Bearer secret'}, 200)):
+            with self.subTest(headers=headers):
+                response = metrics_view(factory.get('/metrics', **headers))
+                self.assertEqual(response.status_code, status)
@@ -0,0 +1,76 @@
+from django.test import override_settings
+
+from recipes.models import Recipe
+from tests.base import DatasetTestCase
+from users.models import User
+
+
+class RecipeListCacheTest(DatasetTestCase):
+    def create_recipe(self):
+        author = User.objects.create(username=f'author_{User.objects.count()}')
+        with self.captureOnCommitCallbacks(execute=True):
+            return Recipe.objects.create(
+                author=author, name='Новый рецепт', text='Описание',
+                cooking_time=10, image='recipes/images/synthetic.png')
+
+    def get_ids(self, params):
+        response = self.anonymous.get('/api/recipes/', params)
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_created_recipe_invalidates_cached_lists(self):
+        for params in ({}, {'ordering': '-pub_date'},
+                       {'ordering': '-favorites_count', 'limit': 200}):
+            with self.subTest(params=params):
+                self.get_ids(params)
+                recipe = self.create_recipe()
+                self.assertIn(recipe.id, self.get_ids(params))
+
+    def test_deleted_recipe_invalidates_cached_lists(self):
+        params = {'ordering': '-pub_date'}
+        recipe_id = self.get_ids(params)[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            Recipe.objects.filter(id=recipe_id).delete()
+        self.assertNotIn(recipe_id, self.get_ids(params))
+
+
+class RecipeCursorTest(DatasetTestCase):
+    def walk(self, params):
+        ids, url, params = [], '/api/recipes/', {
+            'pagination': 'cursor', 'limit': 7, **params}
+        while url:
+            response = self.anonymous.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            ids += [recipe['id'] for recipe in response.data['results']]
+            url, params = response.data['next'], {}
+        return ids
+
+    def get_ids(self, params):
+        response = self.anonymous.get('/api/recipes/',
+                                      {'limit': 1000, **params})
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_cursor_keeps_active_ordering(self):
+        cases = ({}, {'ordering': '-favorites_count'},
+                 {'ordering': 'favorites_count'}, {'ordering': 'pub_date'},
+                 {'search': 'рецепт ингредиент'}, {'search': 'ингредиент 1'})
+        for fast_rendering in (True, False):
+            for params in cases:
+                with self.subTest(fast_rendering=fast_rendering,
+                                  params=params), override_settings(
+                        FAST_RENDERING=fast_rendering):
+                    expected = self.get_ids(params)
+                    self.assertTrue(expected)
+                    self.assertEqual(self.walk(params), expected)
+
+    def test_previous_cursor_returns_previous_page(self):
+        params = {'ordering': '-favorites_count', 'pagination': 'cursor',
+                  'limit': 5}
+        first = self.anonymous.get('/api/recipes/', params).data
+        second = self.anonymous.get(first['next']).data
+        previous = self.anonymous.get(second['previous']).data
+        self.assertEqual(previous['results'], first['results'])
+
+    def test_invalid_cursor(self):
+        response = self.anonymous.get('/api/recipes/', {'cursor': 'abc'})
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,22 @@
+from django.test import override_settings
+
+from tests.base import DatasetTestCase
+
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=0)
+class RecipeListQueriesTest(DatasetTestCase):
+    def test_list_queries_do_not_depend_on_page_size(self):
+        cases = ((self.anonymous, 4), (self.client, 5))
+        for fast_rendering in (True, False):
+            for client, queries in cases:
+                for limit in (6, 100):
+                    with self.subTest(fast_rendering=fast_rendering,
+                                      authenticated=client is self.client,
+                                      limit=limit), override_settings(
+                            FAST_RENDERING=fast_rendering):
+                        with self.assertNumQueries(queries):
+                            response = client.get(
+                                '/api/recipes/', {'limit': limit})
+                        self.assertEqual(response.status_code, 200)
+                        self.assertEqual(len(response.data['results']),
+                                         limit)
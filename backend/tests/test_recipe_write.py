@@ -0,0 +1,67 @@
+import base64
+from io import BytesIO
+
+from PIL import Image
+
+from recipes.models import Ingredient, Recipe, Tag
+from tests.base import DatasetTestCase
+
+
+def get_image():
+    buffer = BytesIO()
+    Image.new('RGB', (4, 4), '#49b64e').save(buffer, 'PNG')
+    return ('data:image/png;base64,'
+            + base64.b64encode(buffer.getvalue()).decode())
+
+
+class RecipeWriteTest(DatasetTestCase):
+    def get_payload(self, ingredients=5, offset=0, tags=2):
+        ids = Ingredient.objects.order_by('id').values_list('id', flat=True)
+        return {
+            'name': 'Тестовый рецепт',
+            'text': 'Описание',
+            'cooking_time': 10,
+            'image': get_image(),
+            'tags': list(Tag.objects.values_list('id', flat=True)[:tags]),
+            'ingredients': [{'id': pk, 'amount': 10 + offset}
+                            for pk in ids[offset:offset + ingredients]],
+        }
+
+    def test_create_queries_do_not_depend_on_ingredients(self):
+        for ingredients in (2, 10):
+            with self.subTest(ingredients=ingredients):
+                with self.assertNumQueries(17):
+                    response = self.client.post(
+                        '/api/recipes/', self.get_payload(ingredients),
+                        format='json')
+                self.assertEqual(response.status_code, 201)
+                self.assertEqual(len(response.data['ingredients']),
+                                 ingredients)
+
+    def test_update_queries_do_not_depend_on_ingredients(self):
+        for ingredients in (4, 12):
+            with self.subTest(ingredients=ingredients):
+                recipe_id = self.client.post(
+                    '/api/recipes/', self.get_payload(),
+                    format='json').data['id']
+                payload = self.get_payload(ingredients, offset=3, tags=3)
+                del payload['image']
+                with self.assertNumQueries(20):
+                    response = self.client.patch(
+                        f'/api/recipes/{recipe_id}/', payload,
+                        format='json')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    sorted(item['amount']
+                           for item in response.data['ingredients']),
+                    [13] * ingredients)
+
+    def test_cooking_time_bounds(self):
+        recipe = Recipe.objects.filter(author=self.user).first()
+        for cooking_time in (-5, 0, 1441):
+            with self.subTest(cooking_time=cooking_time):
+                response = self.client.patch(
+                    f'/api/recipes/{recipe.id}/',
+                    {'cooking_time': cooking_time}, format='json')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('cooking_time', response.data)
@@ -0,0 +1,52 @@
+from django.test import override_settings
+
+from recipes.models import Favorite, Recipe, ShoppingCart, Tag
+from tests.base import DatasetTestCase
+
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=0)
+class FastRenderingParityTest(DatasetTestCase):
+    def get_paths(self):
+        recipe = Recipe.objects.order_by('-favorites_count', '-id').first()
+        favorite = Favorite.objects.filter(user=self.user).first()
+        tag = Tag.objects.order_by('id').first()
+        paths = [
+            '/api/recipes/',
+            '/api/recipes/?limit=50',
+            '/api/recipes/?page=2&limit=7',
+            f'/api/recipes/{recipe.id}/',
+            f'/api/recipes/?tags={tag.slug}',
+            f'/api/recipes/?author={recipe.author_id}',
+            '/api/recipes/?search=рецепт',
+            '/api/recipes/?ordering=-favorites_count&limit=20',
+            '/api/recipes/?pagination=cursor&limit=10',
+            '/api/recipes/?pagination=nocount&page=2',
+            '/api/recipes/?fields=id,name',
+            '/api/recipes/?fields=author.username,tags.slug,is_favorited',
+            '/api/recipes/?omit=ingredients,author.email',
+            '/api/recipes/?fields=ingredients&omit=ingredients.amount',
+            f'/api/recipes/{recipe.id}/?fields=id,tags,ingredients.name',
+            '/api/recipes/0/',
+        ]
+        if favorite is not None:
+            paths.append(f'/api/recipes/{favorite.recipe_id}/')
+        cart = ShoppingCart.objects.filter(user=self.user).first()
+        if cart is not None:
+            paths.append(f'/api/recipes/{cart.recipe_id}/')
+        return paths
+
+    def test_fast_path_matches_serializers(self):
+        user_paths = ['/api/recipes/?is_favorited=1',
+                      '/api/recipes/?is_in_shopping_cart=1']
+        cases = [('anonymous', self.anonymous, self.get_paths()),
+                 ('user', self.client, self.get_paths() + user_paths)]
+        for name, client, paths in cases:
+            for path in paths:
+                with self.subTest(client=name, path=path):
+                    responses = []
+                    for enabled in (False, True):
+                        with override_settings(FAST_RENDERING=enabled):
+                            response = client.get(path)
+                        responses.append((response.status_code,
+                                          response.content))
+                    self.assertEqual(responses[0], responses[1])
@@ -0,0 +1,83 @@
+import os
+import sqlite3
+import tempfile
+
+from django.core.cache import cache
+from django.db import connections
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from users.models import User
+
+REPLICA = 'replica_1'
+PASSWORD = 'replica-password'
+
+
+class ReplicaRoutingTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            'reader', 'reader@example.com', PASSWORD)
+        descriptor, self.path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(descriptor)
+        primary = connections['default']
+        primary.ensure_connection()
+        with sqlite3.connect(self.path) as replica:
+            primary.connection.backup(replica)
+        connections.databases[REPLICA] = {
+            **primary.settings_dict, 'NAME': self.path}
+        self.settings = override_settings(
+            DB_REPLICAS=[self.path],
+            DATABASE_ROUTERS=['api.replicas.ReplicaRouter'],
+            RESPONSE_CACHE_TIMEOUT=0)
+        self.settings.enable()
+
+    def tearDown(self):
+        self.settings.disable()
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.databases[REPLICA]
+        os.remove(self.path)
+
+    def login(self, client):
+        response = client.post('/api/auth/token/login/', {
+            'email': self.user.email, 'password': PASSWORD})
+        self.assertEqual(response.status_code, 200)
+        return response.data['auth_token']
+
+    def test_new_token_is_read_from_primary(self):
+        client = APIClient()
+        token = self.login(APIClient())
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+        self.assertEqual(client.get('/api/users/me/').status_code, 200)
+        cache.clear()
+        self.assertEqual(client.get('/api/users/me/').status_code, 401)
+
+    def test_writer_cookie_pins_reads(self):
+        client = APIClient()
+        self.login(client)
+        self.assertIn('replica_pin', client.cookies)
+        with CaptureQueriesContext(connections[REPLICA]) as queries:
+            self.assertEqual(client.get('/api/recipes/').status_code, 200)
+        self.assertEqual(len(queries), 0)
+        with CaptureQueriesContext(connections[REPLICA]) as queries:
+            self.assertEqual(APIClient().get('/api/recipes/').status_code,
+                             200)
+        self.assertGreater(len(queries), 0)
+
+    def test_signup_pins_following_reads(self):
+        client = APIClient()
+        response = client.post('/api/users/', {
+            'email': 'new@example.com', 'username': 'new_user',
+            'first_name': 'Новый', 'last_name': 'Пользователь',
+            'password': PASSWORD})
+        self.assertEqual(response.status_code, 201)
+        response = client.post('/api/auth/token/login/', {
+            'email': 'new@example.com', 'password': PASSWORD})
+        self.assertEqual(response.status_code, 200)
+        client.credentials(
+            HTTP_AUTHORIZATION=f'Token {response.data["auth_token"]}')
+        response = client.get('/api/users/me/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['email'], 'new@example.com')
@@ -0,0 +1,59 @@
+from django.db import connection
+
+from recipes.models import Recipe
+from recipes.search import SimpleSearchBackend, get_backend
+from tests.base import DatasetTestCase
+from users.models import User
+
+
+class SimpleSearchTest(DatasetTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.recipes = {
+            key: Recipe.objects.create(
+                author=cls.user, name=name, text=text, cooking_time=10,
+                image='recipes/images/synthetic.png')
+            for key, name, text in (
+                ('title', 'Украинский борщ', 'Свёкла и капуста.'),
+                ('text', 'Обед', 'Сначала сварите борщ из свёклы.'),
+                ('both', 'Борщ с пампушками', 'Борщ подают со сметаной.'),
+                ('other', 'Солянка', 'Копчёности и оливки.'),
+            )
+        }
+
+    def search(self, value, **params):
+        response = self.anonymous.get('/api/recipes/',
+                                      {'search': value, **params})
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_fallback_backend_on_sqlite(self):
+        self.assertEqual(connection.vendor, 'sqlite')
+        self.assertIsInstance(get_backend(), SimpleSearchBackend)
+
+    def test_title_matches_rank_first(self):
+        self.assertEqual(self.search('борщ'), [
+            self.recipes['both'].id,
+            self.recipes['title'].id,
+            self.recipes['text'].id,
+        ])
+
+    def test_word_forms_and_yo_are_normalized(self):
+        self.assertEqual(set(self.search('борща свеклой')), {
+            self.recipes['title'].id, self.recipes['text'].id})
+
+    def test_all_terms_are_required(self):
+        self.assertEqual(self.search('борщ сметана'),
+                         [self.recipes['both'].id])
+
+    def test_empty_terms_match_nothing(self):
+        self.assertEqual(self.search('!!!'), [])
+
+    def test_search_combines_with_filters(self):
+        self.assertEqual(
+            self.search('борщ', author=self.recipes['text'].author_id),
+            [self.recipes['both'].id, self.recipes['title'].id,
+             self.recipes['text'].id])
+        other = User.objects.exclude(id=self.user.id).first()
+        self.assertEqual(self.search('борщ', author=other.id), [])
@@ -0,0 +1,87 @@
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+
+from recipes.models import Ingredient, IngredientInRecipe, Recipe, Tag
+from recipes.similarity import similarity_index
+from tests.base import DatasetTestCase
+
+
+class SimilarRecipesTest(DatasetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.build_index(full=True)
+
+    def build_index(self, **options):
+        stdout = StringIO()
+        call_command('build_similarity_index', stdout=stdout, **options)
+        return stdout.getvalue()
+
+    def create_recipe(self, name, ingredients, tag):
+        recipe = Recipe.objects.create(
+            author=self.user, name=name, text='Описание', cooking_time=10,
+            image='recipes/images/synthetic.png')
+        IngredientInRecipe.objects.bulk_create(
+            IngredientInRecipe(recipe=recipe, ingredient=ingredient,
+                               amount=10)
+            for ingredient in ingredients)
+        recipe.tags.add(tag)
+        return recipe
+
+    def create_pair(self):
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f'редкий ингредиент {number}',
+                       measurement_unit='г')
+            for number in range(3))
+        ingredients = Ingredient.objects.filter(
+            name__startswith='редкий ингредиент')
+        tag = Tag.objects.order_by('id').first()
+        return (self.create_recipe('Первый', ingredients, tag),
+                self.create_recipe('Второй', ingredients[:2], tag))
+
+    def get_similar(self, recipe, **params):
+        response = self.anonymous.get(f'/api/recipes/{recipe.id}/similar/',
+                                      params)
+        self.assertEqual(response.status_code, 200)
+        return [item['id'] for item in response.data]
+
+    def test_new_recipes_are_indexed_by_command(self):
+        first, second = self.create_pair()
+        self.assertEqual(self.get_similar(first), [])
+        self.build_index()
+        self.assertEqual(self.get_similar(first)[0], second.id)
+        self.assertEqual(self.get_similar(second)[0], first.id)
+        self.assertEqual(len(self.get_similar(first, limit=3)), 3)
+
+    def test_api_update_marks_recipe_changed(self):
+        first, second = self.create_pair()
+        self.build_index()
+        response = self.client.patch(f'/api/recipes/{second.id}/', {
+            'tags': [Tag.objects.order_by('id').last().id],
+            'ingredients': [
+                {'id': pk, 'amount': 10}
+                for pk in Ingredient.objects.exclude(
+                    name__startswith='редкий ингредиент'
+                ).order_by('id').values_list('id', flat=True)[:3]],
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_similar(first)[0], second.id)
+        self.build_index()
+        self.assertNotEqual(self.get_similar(first)[0], second.id)
+
+    def test_deleted_recipe_is_dropped(self):
+        first, second = self.create_pair()
+        self.build_index()
+        second.delete()
+        self.build_index()
+        self.assertNotIn(second.id, self.get_similar(first, limit=20))
+
+    def test_unchanged_index_is_kept(self):
+        target = similarity_index._read_link()
+        self.assertIn('актуален', self.build_index())
+        self.assertEqual(similarity_index._read_link(), target)
+
+    def test_busy_index_is_not_rebuilt(self):
+        with similarity_index.refreshing():
+            with self.assertRaises(CommandError):
+                self.build_index()
@@ -1,17 +1,79 @@
+from collections import defaultdict
+
 from django.contrib import admin
+from django.db import transaction
 
+from core.admin import CountedModelAdmin, ScalableModelAdmin
+from recipes import counters, shopping_list
+from recipes.models import Favorite, ShoppingCart, ShoppingListItem
 from users.models import Follow, User
 
 admin.site.unregister(User)
 
 
 @admin.register(User)
-class UserAdmin(admin.ModelAdmin):
-    list_display = ('username', 'email', 'first_name', 'last_name')
-    search_fields = ('email', 'username')
-    list_filter = ('first_name', 'last_name')
+class UserAdmin(ScalableModelAdmin):
+    list_display = ('username', 'email', 'first_name', 'last_name',
+                    'recipes_count', 'followers_count')
+    list_select_related = ('stats',)
+    search_fields = ('^email', '^username')
+    list_filter = ('is_staff', 'is_active')
+
+    def recipes_count(self, obj):
+        stats = getattr(obj, 'stats', None)
+        return stats.recipes_count if stats else 0
+
+    def followers_count(self, obj):
+        stats = getattr(obj, 'stats', None)
+        return stats.followers_count if stats else 0
+
+    recipes_count.short_description = 'Рецептов'
+    followers_count.short_description = 'Подписчиков'
+
+    def get_deleted_objects(self, objs, request):
+        deleted, counts, perms_needed, protected = super(
+        ).get_deleted_objects(objs, request)
+        perms_needed.discard(ShoppingListItem._meta.verbose_name)
+        return deleted, counts, perms_needed, protected
+
+    @transaction.atomic
+    def delete_model(self, request, obj):
+        self.release_relations([obj.id])
+        super().delete_model(request, obj)
+
+    @transaction.atomic
+    def delete_queryset(self, request, queryset):
+        self.release_relations(list(queryset.values_list('id', flat=True)))
+        super().delete_queryset(request, queryset)
+
+    def release_relations(self, user_ids):
+        carts = defaultdict(list)
+        for user_id, recipe_id in ShoppingCart.objects.filter(
+                recipe__author_id__in=user_ids).exclude(
+                user_id__in=user_ids).values_list('user_id', 'recipe_id'):
+            carts[user_id].append(recipe_id)
+        for user_id, recipe_ids in carts.items():
+            shopping_list.remove_recipes(user_id, recipe_ids)
+        for model, field, change, name in (
+                (Favorite, 'recipe_id', counters.change_many_recipe_counters,
+                 'favorites_count'),
+                (ShoppingCart, 'recipe_id',
+                 counters.change_many_recipe_counters, 'in_carts_count'),
+                (Follow, 'author_id', counters.change_many_user_counters,
+                 'followers_count')):
+            counters.change_counted(
+                change, model.objects.filter(user_id__in=user_ids).values_list(
+                    field, flat=True), **{name: -1})
 
 
 @admin.register(Follow)
-class FollowAdmin(admin.ModelAdmin):
+class FollowAdmin(CountedModelAdmin):
     list_display = ('user', 'author')
+    list_select_related = ('user', 'author')
+    search_fields = ('=user__username', '=author__username')
+    autocomplete_fields = ('user', 'author')
+    counted_field = 'author_id'
+
+    def change_counters(self, ids, delta):
+        counters.change_counted(counters.change_many_user_counters, ids,
+                                followers_count=delta)
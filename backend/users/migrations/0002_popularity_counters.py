@@ -0,0 +1,54 @@
+# Generated by Django 3.2 on 2026-10-17 05:57
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def count_subquery(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+            field).annotate(count=Count('*')).values('count')
+    ), 0)
+
+
+def fill_user_stats(apps, schema_editor):
+    User = apps.get_model('auth', 'User')
+    UserStats = apps.get_model('users', 'UserStats')
+    users = User.objects.annotate(
+        live_recipes=count_subquery(
+            apps.get_model('recipes', 'Recipe'), 'author'),
+        live_followers=count_subquery(
+            apps.get_model('users', 'Follow'), 'author'),
+    ).values_list('id', 'live_recipes', 'live_followers')
+    UserStats.objects.bulk_create(
+        (UserStats(user_id=user, recipes_count=recipes,
+                   followers_count=followers)
+         for user, recipes, followers in users.iterator()),
+        batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0001_initial'),
+        ('recipes', '0007_popularity_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='auth.user', verbose_name='Пользователь')),
+                ('recipes_count', models.PositiveIntegerField(default=0, editable=False, verbose_name='Рецептов')),
+                ('followers_count', models.PositiveIntegerField(default=0, editable=False, verbose_name='Подписчиков')),
+            ],
+            options={
+                'verbose_name': 'Счётчики пользователя',
+                'verbose_name_plural': 'Счётчики пользователей',
+            },
+        ),
+        migrations.RunPython(fill_user_stats, migrations.RunPython.noop),
+    ]